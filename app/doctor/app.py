@@ -6,7 +6,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, date, timedelta
 import json
 import time
 from db.visit_repo import (
@@ -14,10 +14,19 @@ from db.visit_repo import (
     get_next_visit_for_tier, 
     mark_visit_completed, 
     get_visit_by_id,
-    get_waiting_visits,
-    get_completed_visits
+    get_completed_visits_page,
+    claim_visit,
+    claim_next_visit,
+    release_visit,
+    get_doctor_active_visit,
+    get_consultation_detail,
+    get_queue_cards,
+    get_queue_version,
+    search_visits,
+    visit_tokens
 )
 from db.patient_repo import get_patient_by_phone
+from db.router import use_clinic, local_clinic
 
 # Page config with white mode and hospital colors
 st.set_page_config(
@@ -636,6 +645,9 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+HISTORY_PAGE_SIZE = 20
+SEARCH_RANGES = {"Any time": None, "Today": 0, "Last 7 days": 7, "Last 30 days": 30}
+
 # Session State
 if 'doctor_auth' not in st.session_state:
     st.session_state.doctor_auth = False
@@ -645,6 +657,8 @@ if 'last_refresh' not in st.session_state:
     st.session_state.last_refresh = time.time()
 if 'show_history' not in st.session_state:
     st.session_state.show_history = False
+if 'rendered_queue_version' not in st.session_state:
+    st.session_state.rendered_queue_version = None
 
 def login_page():
     # Centered login card
@@ -710,15 +724,85 @@ def complete_visit(visit_id, diagnosis, prescription):
         st.error(f"Error completing visit: {e}")
         return False
 
+def select_patient(visit_id, doctor_id):
+    """Claim a queued visit so no other doctor can pick the same patient"""
+    if not claim_visit(visit_id, doctor_id):
+        st.warning("This patient was just taken by another doctor.")
+        return False
+    st.session_state.current_patient = get_consultation_detail(visit_id)
+    return True
+
+def call_next_patient(doc):
+    claimed = claim_next_visit(doc['role_tier'], doc['id'])
+    if not claimed:
+        st.info("No patients waiting.")
+        return False
+    st.session_state.current_patient = get_consultation_detail(claimed['id'])
+    return True
+
+def render_search_results(query, tier, days):
+    """Ranked full-text search results, paged with a 'More results' button"""
+    search_key = (query, tier, days)
+    if st.session_state.get('search_key') != search_key:
+        st.session_state.search_key = search_key
+        st.session_state.search_pages = 1
+    
+    date_range = None
+    if days is not None:
+        date_range = (date.today() - timedelta(days=days), date.today())
+    hits, has_more = search_visits(
+        query, tier=tier, date_range=date_range,
+        limit=HISTORY_PAGE_SIZE * st.session_state.search_pages
+    )
+    
+    if not hits:
+        st.markdown("""
+            <div class="empty-state">
+                <div class="empty-icon">🔍</div>
+                <div>No matching consultations</div>
+            </div>
+        """, unsafe_allow_html=True)
+        return
+    
+    for hit in hits:
+        status = '✓ ' + hit['completed_at'] if hit['completed_at'] else hit['status']
+        st.markdown(f"""
+            <div class="history-card">
+                <div class="history-card-header">
+                    <div class="history-card-left">
+                        <div class="history-token">{' · '.join(visit_tokens(hit['id'], hit['journal_ref']))}</div>
+                        <div class="history-patient">{hit['patient_name'] or 'Unknown Patient'}</div>
+                    </div>
+                    <div class="history-card-right">
+                        <div class="history-time">{status}</div>
+                    </div>
+                </div>
+                <div class="history-content-box">{hit['snippet']}</div>
+            </div>
+        """, unsafe_allow_html=True)
+    
+    if has_more:
+        if st.button("⬇️ More results", use_container_width=True, key="search_more"):
+            st.session_state.search_pages += 1
+            st.rerun()
+
 def dashboard():
     doc = st.session_state.doctor_info
     
-    # Auto-refresh mechanism: Rerun every 5 seconds
-    # This simulates real-time updates by polling the database
+    # Resume a consultation this doctor claimed before a reload/logout
+    if not st.session_state.get('current_patient'):
+        active = get_doctor_active_visit(doc['id'])
+        if active:
+            st.session_state.current_patient = active
+    
+    # Auto-refresh mechanism: poll every 5 seconds, but only rerun when the
+    # queue version moved since the last render
+    queue_version = get_queue_version()
     current_time = time.time()
     if current_time - st.session_state.last_refresh > 5:
         st.session_state.last_refresh = current_time
-        st.rerun()
+        if queue_version != st.session_state.rendered_queue_version:
+            st.rerun()
     
     # Sticky Header with Doctor Info
     st.markdown(f"""
@@ -752,13 +836,20 @@ def dashboard():
                     type="primary" if st.session_state.show_history else "secondary",
                     key="tab_history"):
             st.session_state.show_history = True
+            st.session_state.history_key = None
+            st.session_state.history_pages = 1
             st.rerun()
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Main Content
     if not st.session_state.show_history:
         # LIVE QUEUE VIEW - Left Panel + Center Panel Layout
-        queue = get_waiting_visits(doc['role_tier'])
+        queue_key = (doc['role_tier'], queue_version)
+        if st.session_state.get('queue_cache_key') != queue_key:
+            st.session_state.queue_cache = get_queue_cards(doc['role_tier'])
+            st.session_state.queue_cache_key = queue_key
+        queue = st.session_state.queue_cache
+        st.session_state.rendered_queue_version = queue_version
         
         # Two-column layout: Queue (Left) | Consultation (Center/Right)
         col_queue, col_consult = st.columns([1, 2], gap="large")
@@ -772,6 +863,11 @@ def dashboard():
                 </div>
             """, unsafe_allow_html=True)
             
+            if queue and not st.session_state.get('current_patient'):
+                if st.button("▶️ Call Next Patient", type="primary", use_container_width=True, key="btn_call_next"):
+                    if call_next_patient(doc):
+                        st.rerun()
+            
             if not queue:
                 st.markdown("""
                     <div class="empty-state">
@@ -780,9 +876,9 @@ def dashboard():
                     </div>
                 """, unsafe_allow_html=True)
             
-            for i, patient in enumerate(queue):
-                visit_id = patient['id']
-                score = patient['risk_score']
+            for card in queue:
+                visit_id = card.id
+                score = card.risk_score
                 
                 # Determine risk level and color
                 if score > 0.7:
@@ -799,16 +895,17 @@ def dashboard():
                     st.markdown(f"""
                         <div class="queue-card {risk_class}">
                             <div class="queue-card-header">
-                                <div class="queue-token">T-{visit_id:08d}</div>
+                                <div class="queue-token">{' · '.join(visit_tokens(visit_id, card.journal_ref))}</div>
                                 {risk_badge}
                             </div>
                             <div class="queue-score">Score: {score:.2f}</div>
                         </div>
                     """, unsafe_allow_html=True)
                     
-                    if st.button(f"Select", key=f"btn_{visit_id}", use_container_width=True):
-                        st.session_state.current_patient = patient
-                        st.rerun()
+                    if st.button(f"Select", key=f"btn_{visit_id}", use_container_width=True,
+                                 disabled=bool(st.session_state.get('current_patient'))):
+                        if select_patient(visit_id, doc['id']):
+                            st.rerun()
         
         with col_consult:
             # Center Panel: Current Consultation
@@ -822,10 +919,10 @@ def dashboard():
                     <div class="patient-info-card">
                         <div class="patient-info-row">
                             <div>
-                                <div class="patient-name-large">{p.get('patient_name') or 'Unknown Patient'}</div>
-                                <div class="patient-meta">YOB: {p.get('patient_yob', 'N/A')}</div>
+                                <div class="patient-name-large">{p.patient_name or 'Unknown Patient'}</div>
+                                <div class="patient-meta">YOB: {p.patient_yob}</div>
                             </div>
-                            <div class="token-display-badge">T-{p['id']:08d}</div>
+                            <div class="token-display-badge">{' · '.join(visit_tokens(p.id, p.journal_ref))}</div>
                         </div>
                     </div>
                 """, unsafe_allow_html=True)
@@ -833,13 +930,13 @@ def dashboard():
                 # AI Summary in Soft Blue Panel - Assistive Only
                 st.markdown('<div class="ai-section-title">🤖 AI Clinical Summary <span class="assistive-label">(Assistive)</span></div>', unsafe_allow_html=True)
                 
-                if p.get('ai_summary'):
+                if p.ai_summary:
                     st.markdown(f"""
                         <div class="ai-summary-panel">
                             <div class="ai-disclaimer">AI-generated suggestion • Not a diagnosis • For reference only</div>
-                            <div class="ai-content-limited">{p['ai_summary']}</div>
+                            <div class="ai-content-limited">{p.ai_summary}</div>
                             <div class="ai-footer">
-                                Risk Score: {p.get('risk_score', 0):.2f} • Level: {p.get('risk_level', 'UNKNOWN')}
+                                Risk Score: {p.risk_score or 0:.2f} • Level: {p.risk_level or 'UNKNOWN'}
                             </div>
                         </div>
                     """, unsafe_allow_html=True)
@@ -848,15 +945,15 @@ def dashboard():
                         <div class="ai-summary-panel">
                             <div class="ai-content-empty">AI summary not available for this visit</div>
                             <div class="ai-footer">
-                                Risk Score: {p.get('risk_score', 0):.2f} • Level: {p.get('risk_level', 'UNKNOWN')}
+                                Risk Score: {p.risk_score or 0:.2f} • Level: {p.risk_level or 'UNKNOWN'}
                             </div>
                         </div>
                     """, unsafe_allow_html=True)
                 
                 # Emergency Check
-                if p.get('symptoms_list'):
+                if p.symptoms_list:
                     try:
-                        symptoms_text = p.get('symptoms_raw', '')
+                        symptoms_text = p.symptoms_raw or ''
                         if any(w in symptoms_text.lower() for w in ['heart attack', 'stroke', 'bleeding', 'unconscious', 'chest pain']):
                             st.markdown("""
                                 <div class="emergency-alert">
@@ -868,7 +965,7 @@ def dashboard():
                 
                 # Symptoms
                 st.markdown('<div class="section-label">🗣️ Reported Symptoms</div>', unsafe_allow_html=True)
-                st.info(p.get('symptoms_raw', 'No symptoms recorded'))
+                st.info(p.symptoms_raw or 'No symptoms recorded')
                 
                 st.write("")
                 
@@ -885,7 +982,7 @@ def dashboard():
                 with col_complete:
                     if st.button("✅ Complete Visit", type="primary", use_container_width=True):
                         if diagnosis:
-                            if complete_visit(p['id'], diagnosis, prescription):
+                            if complete_visit(p.id, diagnosis, prescription):
                                 st.success("✅ Visit completed!")
                                 del st.session_state.current_patient
                                 st.rerun()
@@ -894,6 +991,7 @@ def dashboard():
                 
                 with col_skip:
                     if st.button("⏭️ Skip for Now", use_container_width=True):
+                        release_visit(p.id, doc['id'])
                         del st.session_state.current_patient
                         st.rerun()
             else:
@@ -907,7 +1005,16 @@ def dashboard():
     
     else:
         # HISTORY VIEW - Redesigned
-        history = get_completed_visits(tier=doc['role_tier'], limit=20)
+        # Keyset-paged history: first page follows the queue version, older
+        # pages are appended on demand and kept until the tab is reopened
+        history_key = (doc['role_tier'], queue_version)
+        if st.session_state.get('history_key') != history_key and st.session_state.get('history_pages', 1) <= 1:
+            rows, next_cursor = get_completed_visits_page(tier=doc['role_tier'], limit=HISTORY_PAGE_SIZE)
+            st.session_state.history_rows = rows
+            st.session_state.history_cursor = next_cursor
+            st.session_state.history_pages = 1
+            st.session_state.history_key = history_key
+        history = st.session_state.history_rows
         
         st.markdown('<div class="main-content">', unsafe_allow_html=True)
         
@@ -918,7 +1025,26 @@ def dashboard():
             </div>
         """, unsafe_allow_html=True)
         
-        if not history:
+        # Full-text search over symptoms, notes and AI summaries
+        search_col, range_col = st.columns([3, 1])
+        with search_col:
+            search_query = st.text_input(
+                "Search consultations",
+                key="history_search",
+                placeholder="🔍 Search symptoms, diagnoses, notes (e.g. dengue)",
+                label_visibility="collapsed"
+            )
+        with range_col:
+            search_range = st.selectbox(
+                "Date range",
+                list(SEARCH_RANGES.keys()),
+                key="history_search_range",
+                label_visibility="collapsed"
+            )
+        
+        if search_query:
+            render_search_results(search_query, doc['role_tier'], SEARCH_RANGES[search_range])
+        elif not history:
             st.markdown("""
                 <div class="empty-state">
                     <div class="empty-icon">📋</div>
@@ -928,7 +1054,7 @@ def dashboard():
         else:
             for h in history:
                 # Determine risk badge
-                risk_level = h.get('risk_level', 'UNKNOWN')
+                risk_level = h.risk_level or 'UNKNOWN'
                 if risk_level == 'HIGH':
                     risk_badge_html = '<span class="risk-badge risk-high">High Risk</span>'
                 elif risk_level == 'MEDIUM':
@@ -939,15 +1065,15 @@ def dashboard():
                     risk_badge_html = '<span class="risk-badge" style="background: #E5E7EB; color: #6B7280;">Unknown</span>'
                 
                 # Format completion time
-                completed_time = h.get('completed_at', 'N/A')
+                completed_time = h.completed_at or 'N/A'
                 
                 # Card header (always visible)
                 st.markdown(f"""
                     <div class="history-card">
                         <div class="history-card-header">
                             <div class="history-card-left">
-                                <div class="history-token">T-{h['id']:08d}</div>
-                                <div class="history-patient">{h.get('patient_name', 'Unknown Patient')}</div>
+                                <div class="history-token">{' · '.join(visit_tokens(h.id, h.journal_ref))}</div>
+                                <div class="history-patient">{h.patient_name or 'Unknown Patient'}</div>
                             </div>
                             <div class="history-card-right">
                                 {risk_badge_html}
@@ -957,8 +1083,8 @@ def dashboard():
                     </div>
                 """, unsafe_allow_html=True)
                 
-                # Expandable details
-                with st.expander("View Details", expanded=False):
+                # Details on demand: symptoms/summary/notes are only fetched when opened
+                if st.toggle("View Details", key=f"history_details_{h.id}"):
                     st.markdown('<div class="history-details">', unsafe_allow_html=True)
                     
                     # Patient Info
@@ -968,15 +1094,15 @@ def dashboard():
                             <div class="history-info-grid">
                                 <div class="history-info-item">
                                     <span class="history-info-label">Name:</span>
-                                    <span class="history-info-value">{h.get('patient_name', 'Unknown')}</span>
+                                    <span class="history-info-value">{h.patient_name or 'Unknown'}</span>
                                 </div>
                                 <div class="history-info-item">
                                     <span class="history-info-label">YOB:</span>
-                                    <span class="history-info-value">{h.get('patient_yob', 'N/A')}</span>
+                                    <span class="history-info-value">{h.patient_yob or 'N/A'}</span>
                                 </div>
                                 <div class="history-info-item">
                                     <span class="history-info-label">Risk Score:</span>
-                                    <span class="history-info-value">{h.get('risk_score', 0):.2f}</span>
+                                    <span class="history-info-value">{h.risk_score or 0:.2f}</span>
                                 </div>
                             </div>
                         </div>
@@ -987,14 +1113,14 @@ def dashboard():
                         <div class="history-section">
                             <div class="history-section-label">🗣️ Reported Symptoms</div>
                             <div class="history-content-box">
-                                {h.get('symptoms_raw', 'No symptoms recorded')}
+                                {h.symptoms_raw or 'No symptoms recorded'}
                             </div>
                         </div>
                     """, unsafe_allow_html=True)
                     
                     # AI Summary (if available)
-                    if h.get('ai_summary'):
-                        ai_summary_text = h['ai_summary'].replace('\n', '<br>')
+                    if h.ai_summary:
+                        ai_summary_text = h.ai_summary.replace('\n', '<br>')
                         st.markdown(f"""
                             <div class="history-section">
                                 <div class="history-section-label">🤖 AI Clinical Summary <span style="font-size: 0.75rem; color: #9CA3AF; font-style: italic;">(Assistive)</span></div>
@@ -1005,8 +1131,8 @@ def dashboard():
                         """, unsafe_allow_html=True)
                     
                     # Doctor's Notes (Prominent)
-                    if h.get('doctor_notes'):
-                        doctor_notes_text = h['doctor_notes'].replace('\n', '<br>')
+                    if h.doctor_notes:
+                        doctor_notes_text = h.doctor_notes.replace('\n', '<br>')
                         st.markdown(f"""
                             <div class="history-section">
                                 <div class="history-section-label">📝 Doctor's Diagnosis & Notes</div>
@@ -1026,8 +1152,9 @@ def dashboard():
                         """, unsafe_allow_html=True)
                     
                     # Prescription (if available)
-                    if h.get('prescription'):
-                        prescription_text = h['prescription'].replace('\n', '<br>')
+                    prescription = getattr(h, 'prescription', None)
+                    if prescription:
+                        prescription_text = prescription.replace('\n', '<br>')
                         st.markdown(f"""
                             <div class="history-section">
                                 <div class="history-section-label">💊 Prescription</div>
@@ -1038,6 +1165,18 @@ def dashboard():
                         """, unsafe_allow_html=True)
                     
                     st.markdown('</div>', unsafe_allow_html=True)
+            
+            if st.session_state.history_cursor:
+                if st.button("⬇️ Load older consultations", use_container_width=True, key="history_more"):
+                    rows, next_cursor = get_completed_visits_page(
+                        tier=doc['role_tier'],
+                        cursor=st.session_state.history_cursor,
+                        limit=HISTORY_PAGE_SIZE
+                    )
+                    st.session_state.history_rows = history + rows
+                    st.session_state.history_cursor = next_cursor
+                    st.session_state.history_pages += 1
+                    st.rerun()
         
         st.markdown('</div>', unsafe_allow_html=True)
     
@@ -1060,4 +1199,5 @@ def main():
         dashboard()
 
 if __name__ == "__main__":
-    main()
+    with use_clinic(local_clinic()):
+        main()
@@ -11,8 +11,11 @@ from ai.summary import generate_doctor_summary
 from ml.model import predict_risk_score
 import json
 from datetime import datetime
-from db.patient_repo import get_patient_by_phone, create_patient, verify_patient, update_patient_name
-from db.visit_repo import create_visit, get_queue_position, get_previous_visits
+from db.patient_repo import get_patient_by_phone, create_patient, verify_patient
+from db.router import use_clinic, local_clinic
+from db.visit_repo import get_wait_estimate, get_provisional_wait_estimate, get_previous_visits
+from db.journal import submit_checkin, CheckinRejected
+from db.connection import session
 import time
 
 # --- CONFIGURATION ---
@@ -553,28 +556,34 @@ def render_kiosk_voice_input():
              }
              
              risk_score = predict_risk_score(symptoms, age)
+             assigned_tier = 'SENIOR' if risk_score > 0.7 else 'JUNIOR'
+             new_name = name if name and st.session_state.patient_data.get('name') == 'Unknown' else None
              
-             if name and st.session_state.patient_data.get('name') == 'Unknown':
-                 update_patient_name(st.session_state.patient_phone, name)
-                 
-             visit_id = create_visit(
-                 st.session_state.patient_phone,
-                 symptoms,
-                 json.dumps([symptoms]),
-                 risk_score,
-                 'SENIOR' if risk_score > 0.7 else ('MEDIUM' if risk_score > 0.4 else 'LOW'),
-                 'SENIOR' if risk_score > 0.7 else 'JUNIOR'
-             )
+             # Journaled: the token is issued even while the database is busy
+             try:
+                 visit_id, token = submit_checkin(
+                     st.session_state.patient_phone,
+                     symptoms,
+                     json.dumps([symptoms]),
+                     risk_score,
+                     'SENIOR' if risk_score > 0.7 else ('MEDIUM' if risk_score > 0.4 else 'LOW'),
+                     assigned_tier,
+                     patient_name=new_name
+                 )
+             except CheckinRejected:
+                 st.error("Sorry, we could not register your visit. Please ask the front desk for help.")
+                 token = None
+             
+             if token:
+                 with session(readonly=True):  # One snapshot, no commit for the estimate reads
+                     estimate = (get_wait_estimate(visit_id) if visit_id else None) or get_provisional_wait_estimate(assigned_tier)
              
-             if visit_id:
-                 assigned_tier = 'SENIOR' if risk_score > 0.7 else 'JUNIOR'
-                 queue_position = get_queue_position(assigned_tier)
-                 
                  st.session_state.token_data = {
-                     'token': f"{visit_id:08d}",
+                     'token': token,
                      'tier': assigned_tier,
-                     'wait_time': queue_position * 8,
-                     'queue_position': queue_position
+                     'wait_time': estimate['wait_p50'],
+                     'wait_time_p90': estimate['wait_p90'],
+                     'queue_position': estimate['queue_position']
                  }
                  st.session_state.token_generated = True
                  st.session_state.kiosk_step = 'SUCCESS'
@@ -604,7 +613,8 @@ def render_kiosk_success():
 <div style="font-size: 1.5rem; font-weight: 700; color: #0F766E;">TOKEN NUMBER</div>
 <div style="font-size: 5rem; font-weight: 900; color: #0F766E; line-height: 1;">T-{token['token']}</div>
 </div>
-<div style="font-size: 1.5rem;">Wait Time: <strong style="color: #D97706">{token['wait_time']} mins</strong></div>
+<div style="font-size: 1.5rem; margin-bottom: 0.5rem;">Queue Position: <strong style="color: #0F766E">#{token['queue_position']}</strong></div>
+<div style="font-size: 1.5rem;">Wait Time: <strong style="color: #D97706">~{token['wait_time']} mins</strong> <span style="font-size: 1rem; color: #6B7280;">(up to {token['wait_time_p90']} mins)</span></div>
 </div>
 """, unsafe_allow_html=True)
 
@@ -729,4 +739,5 @@ def main():
         render_kiosk_home()
 
 if __name__ == "__main__":
-    main()
+    with use_clinic(local_clinic()):
+        main()
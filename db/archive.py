@@ -0,0 +1,50 @@
+"""
+Hot/cold split for visits.
+
+COMPLETED visits older than a configurable age are moved from the live
+`visits` table into `visits_archive` in small batches, each in its own
+short transaction, so kiosks and dashboards keep writing in between. The
+history read APIs in visit_repo union both tables.
+"""
+import time
+from db.connection import get_db
+
+ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_BATCH_PAUSE = 0.05  # Seconds between batches, lets queued writers in
+
+# Explicit column list: older databases have columns in ALTER TABLE order
+VISIT_COLUMNS = (
+    'id, patient_phone, symptoms_raw, symptoms_list, risk_score, risk_level, assigned_tier, '
+    'status, ai_summary, created_at, completed_at, doctor_notes, doctor_id, claimed_at, journal_ref'
+)
+
+def archive_completed_visits(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE,
+                             pause=ARCHIVE_BATCH_PAUSE, max_batches=None):
+    """Move old COMPLETED visits into visits_archive; returns the number moved"""
+    cutoff = f'-{int(older_than_days)} days'
+    moved = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with get_db(standalone=True) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            ids = [row[0] for row in conn.execute('''
+                SELECT id FROM visits
+                WHERE status = 'COMPLETED' AND completed_at < datetime('now', ?)
+                ORDER BY completed_at
+                LIMIT ?
+            ''', (cutoff, batch_size))]
+            if not ids:
+                break
+            placeholders = ', '.join('?' * len(ids))
+            conn.execute(f'''
+                INSERT OR REPLACE INTO visits_archive ({VISIT_COLUMNS})
+                SELECT {VISIT_COLUMNS} FROM visits WHERE id IN ({placeholders})
+            ''', ids)
+            conn.execute(f'DELETE FROM visits WHERE id IN ({placeholders})', ids)
+        moved += len(ids)
+        batches += 1
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
+    return moved
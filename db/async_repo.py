@@ -0,0 +1,105 @@
+"""
+Asyncio variant of the repo API.
+
+Every coroutine here runs the matching sync repo function on a dedicated DB
+thread, so an API server or background worker can await database calls
+alongside LLM calls (ai/processing.py) without blocking its event loop.
+
+Writes go through a single writer thread: in-process writers queue in
+Python instead of contending for SQLite's write lock. Reads use a small
+reader pool, which WAL lets run concurrently with the writer. The caller's
+contextvars are carried onto the DB thread.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from db import patient_repo, visit_repo
+
+READER_THREADS = 4
+
+class DatabaseExecutor:
+    """One writer thread plus a pool of reader threads"""
+
+    def __init__(self, readers=READER_THREADS):
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='db-reader')
+
+    async def _run(self, pool, fn, args, kwargs):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        return await loop.run_in_executor(pool, call)
+
+    async def read(self, fn, *args, **kwargs):
+        return await self._run(self._readers, fn, args, kwargs)
+
+    async def write(self, fn, *args, **kwargs):
+        return await self._run(self._writer, fn, args, kwargs)
+
+    def shutdown(self, wait=True):
+        self._writer.shutdown(wait=wait)
+        self._readers.shutdown(wait=wait)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = DatabaseExecutor()
+    return _executor
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+def _reader(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await get_executor().read(fn, *args, **kwargs)
+    return wrapper
+
+def _writer(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await get_executor().write(fn, *args, **kwargs)
+    return wrapper
+
+# Patients
+get_patient_by_phone = _reader(patient_repo.get_patient_by_phone)
+verify_patient = _reader(patient_repo.verify_patient)
+get_all_patients = _reader(patient_repo.get_all_patients)
+create_patient = _writer(patient_repo.create_patient)
+update_patient_name = _writer(patient_repo.update_patient_name)
+
+# Visits: queue
+create_visit = _writer(visit_repo.create_visit)
+mark_visit_completed = _writer(visit_repo.mark_visit_completed)
+claim_visit = _writer(visit_repo.claim_visit)
+claim_next_visit = _writer(visit_repo.claim_next_visit)
+release_visit = _writer(visit_repo.release_visit)
+get_next_visit_for_tier = _reader(visit_repo.get_next_visit_for_tier)
+get_queue_cards = _reader(visit_repo.get_queue_cards)
+get_waiting_visits = _reader(visit_repo.get_waiting_visits)
+get_top_waiting_visits = _reader(visit_repo.get_top_waiting_visits)
+get_queue_version = _reader(visit_repo.get_queue_version)
+get_queue_position = _reader(visit_repo.get_queue_position)
+get_queue_rank = _reader(visit_repo.get_queue_rank)
+get_wait_estimate = _reader(visit_repo.get_wait_estimate)
+
+# Visits: consultations and history
+verify_doctor = _reader(visit_repo.verify_doctor)
+get_visit_by_id = _reader(visit_repo.get_visit_by_id)
+get_consultation_detail = _reader(visit_repo.get_consultation_detail)
+get_doctor_active_visit = _reader(visit_repo.get_doctor_active_visit)
+get_visit_text = _reader(visit_repo.get_visit_text)
+get_previous_visits = _reader(visit_repo.get_previous_visits)
+get_completed_visits = _reader(visit_repo.get_completed_visits)
+get_completed_visits_page = _reader(visit_repo.get_completed_visits_page)
+search_visits = _reader(visit_repo.search_visits)
@@ -0,0 +1,140 @@
+"""
+Online backups with the sqlite3 backup API.
+
+The database is copied a few pages at a time with a short sleep between
+steps, so kiosks and dashboards keep reading and writing while a backup
+runs. The source connection holds one read transaction for the whole copy:
+under WAL that pins a consistent snapshot, so writes made meanwhile do not
+force the backup to restart (they stay in the WAL until it finishes).
+
+Each backup is gzipped into BACKUP_DIR as `<db>-YYYYmmdd-HHMMSS-mmm.db.gz` and
+only the newest KEEP_SNAPSHOTS are kept.
+"""
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from db import connection
+from db.patient_repo import clear_patient_cache
+from db.queue_engine import reset_engines
+
+BACKUP_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'backups')
+BACKUP_PAGES = 1024  # Pages copied per step (4 MiB with the default page size)
+BACKUP_STEP_PAUSE = 0.005  # Seconds slept between steps
+KEEP_SNAPSHOTS = 7
+
+def _snapshot_prefix(db_path):
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+def list_snapshots(backup_dir=None, db_path=None):
+    """Snapshot files of a database, newest first"""
+    backup_dir = backup_dir or BACKUP_DIR
+    prefix = _snapshot_prefix(db_path or connection.current_db_path())
+    return sorted(glob.glob(os.path.join(backup_dir, f'{prefix}-*.db.gz')), reverse=True)
+
+def _copy(source_path, dest_path, pages, pause, progress=None):
+    src = sqlite3.connect(source_path, isolation_level=None, timeout=connection.BUSY_TIMEOUT_MS / 1000)
+    dst = sqlite3.connect(dest_path)
+    try:
+        src.execute('BEGIN')
+        src.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()  # Start the read snapshot
+
+        def step(status, remaining, total):
+            if progress:
+                progress(total - remaining, total)
+            time.sleep(pause)
+
+        src.backup(dst, pages=pages, progress=step)
+        src.execute('COMMIT')
+    finally:
+        dst.close()
+        src.close()
+
+def _compress(path, dest):
+    tmp = dest + '.tmp'
+    with open(path, 'rb') as f_in, gzip.open(tmp, 'wb', compresslevel=6) as f_out:
+        shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+    os.replace(tmp, dest)
+
+def rotate_snapshots(keep=KEEP_SNAPSHOTS, backup_dir=None, db_path=None):
+    """Delete all but the newest `keep` snapshots; returns the deleted paths"""
+    stale = list_snapshots(backup_dir, db_path)[keep:]
+    for path in stale:
+        os.remove(path)
+    return stale
+
+def backup_database(backup_dir=None, pages=BACKUP_PAGES, pause=BACKUP_STEP_PAUSE,
+                    keep=KEEP_SNAPSHOTS, progress=None):
+    """Take a compressed snapshot of the current database while it stays in use.
+
+    progress(copied_pages, total_pages) is called after every step.
+    Returns the snapshot path.
+    """
+    db_path = connection.current_db_path()
+    backup_dir = backup_dir or BACKUP_DIR
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')[:-3]
+    dest = os.path.join(backup_dir, f'{_snapshot_prefix(db_path)}-{stamp}.db.gz')
+
+    fd, raw = tempfile.mkstemp(suffix='.db', dir=backup_dir)
+    os.close(fd)
+    try:
+        _copy(db_path, raw, pages, pause, progress)
+        _compress(raw, dest)
+    finally:
+        os.remove(raw)
+    rotate_snapshots(keep, backup_dir, db_path)
+    return dest
+
+def _decompress(snapshot, dest):
+    with gzip.open(snapshot, 'rb') as f_in, open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+
+def verify_snapshot(snapshot):
+    """Integrity-check a snapshot; returns (ok, details) with table row counts or the errors"""
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'verify.db')
+        _decompress(snapshot, path)
+        conn = sqlite3.connect(path)
+        try:
+            problems = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+            if problems != ['ok']:
+                return False, problems
+            counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                      for table in ('patients', 'visits', 'visits_archive', 'doctors')}
+            return True, counts
+        except sqlite3.Error as e:
+            return False, [str(e)]
+        finally:
+            conn.close()
+
+def restore_snapshot(snapshot, pages=BACKUP_PAGES, pause=BACKUP_STEP_PAUSE):
+    """Replace the current database's contents with a verified snapshot.
+
+    Copies through the backup API into the live file, so other processes
+    see the restored data on their next transaction instead of a file
+    swapped out from under them.
+    """
+    ok, details = verify_snapshot(snapshot)
+    if not ok:
+        raise ValueError(f"Snapshot failed verification: {details}")
+    db_path = connection.current_db_path()
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'restore.db')
+        _decompress(snapshot, path)
+        src = sqlite3.connect(path)
+        dst = sqlite3.connect(db_path, timeout=connection.BUSY_TIMEOUT_MS / 1000)
+        try:
+            src.backup(dst, pages=pages, sleep=pause)
+        finally:
+            dst.close()
+            src.close()
+    # In-process state was built from the old contents
+    connection.close_connections()
+    reset_engines()
+    clear_patient_cache()
+    return details
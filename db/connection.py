@@ -1,22 +1,253 @@
+# Database module
 import sqlite3
+import functools
 import os
+import queue
+import random
+import threading
+import time
 from contextlib import contextmanager
+from contextvars import ContextVar
 
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'telemedicine_queue.db')
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+# Connection tuning shared by every pooled connection
+BUSY_TIMEOUT_MS = 5000
+SYNCHRONOUS = 'NORMAL'  # Safe with WAL: only the last commits can be lost on power failure
+POOL_SIZE = 8
+
+# Retries for writes that still hit a lock after busy_timeout (e.g. a doctor-side write burst)
+RETRY_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.05  # Seconds, doubled per attempt with jitter
+RETRY_MAX_DELAY = 1.0
+
+# Database file for the current context; db.router points this at a clinic's shard
+_db_path = ContextVar('db_path', default=None)
+
+def current_db_path():
+    return _db_path.get() or DB_PATH
+
+@contextmanager
+def use_database(path):
+    """Route every get_db() in this block (and this context) to another database file"""
+    token = _db_path.set(path)
+    try:
+        yield
+    finally:
+        _db_path.reset(token)
+
+def is_busy_error(exc):
+    message = str(exc).lower()
+    return isinstance(exc, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+def _backoff(attempt):
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+    time.sleep(delay * random.uniform(0.5, 1.0))
+
+def retry_on_busy(fn):
+    """Re-run a write transaction with exponential backoff when SQLite reports busy/locked.
+
+    Only for functions that do all their writing in one get_db() block, so a
+    failed attempt has been rolled back in full before the next one. Inside a
+    session() the error propagates instead: only the whole session can retry.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        for attempt in range(RETRY_ATTEMPTS):
+            try:
+                return fn(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or attempt == RETRY_ATTEMPTS - 1 or _session.get():
+                    raise
+                _backoff(attempt)
+    return wrapper
+
+def _configure(conn):
     conn.row_factory = sqlite3.Row
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+    conn.execute(f'PRAGMA synchronous = {SYNCHRONOUS}')
     return conn
 
+def get_connection(path=None):
+    """Open a new, unpooled connection (caller must close it)"""
+    conn = sqlite3.connect(path or current_db_path(), timeout=BUSY_TIMEOUT_MS / 1000)
+    return _configure(conn)
+
+class ConnectionPool:
+    """Keeps idle connections to one database file for reuse across repo calls"""
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._wal_ready = False
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        _configure(conn)
+        if not self._wal_ready:
+            # journal_mode is persistent in the file, so it only has to be set once per process
+            with self._lock:
+                if not self._wal_ready:
+                    conn.execute('PRAGMA journal_mode = WAL')
+                    self._wal_ready = True
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._open()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(path=None):
+    path = path or current_db_path()
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(path, ConnectionPool(path))
+    return pool
+
+def close_connections():
+    """Close every idle pooled connection (e.g. before deleting or restoring the DB file)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
+
+class Session:
+    """One connection and one transaction shared by every get_db() in a session() block"""
+
+    def __init__(self, conn, path, readonly):
+        self.conn = conn
+        self.path = path
+        self.readonly = readonly
+        self._after_commit = []
+
+# Called with the database path after every commit made through get_db() or session()
+_commit_listeners = []
+
+def add_commit_listener(callback):
+    """Register callback(path) to run after each commit of this process (e.g. db.replica)"""
+    _commit_listeners.append(callback)
+
+def _committed(path):
+    for listener in _commit_listeners:
+        listener(path)
+
+# Session of the current context, see session()
+_session = ContextVar('db_session', default=None)
+
+def active_session():
+    return _session.get()
+
+def after_commit(callback):
+    """Run callback once the current write is durable.
+
+    Inside a session that is when the session commits (never, if it rolls
+    back); outside one the caller has already committed, so it runs now.
+    """
+    current = _session.get()
+    if current is None or current.path != current_db_path():
+        callback()
+    else:
+        current._after_commit.append(callback)
+
+def _begin(conn, statement):
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            conn.execute(statement)
+            return
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e) or attempt == RETRY_ATTEMPTS - 1:
+                raise
+            _backoff(attempt)
+
+@contextmanager
+def session(readonly=False):
+    """Group several repo calls into one transaction on one connection.
+
+    Write sessions start with BEGIN IMMEDIATE, so the write lock is taken up
+    front (no lock upgrade half-way) and everything commits with a single
+    fsync, or not at all. Read-only sessions read one consistent snapshot
+    and end without a commit. Nested sessions join the outer one.
+    """
+    current = _session.get()
+    path = current_db_path()
+    if current is not None and current.path == path:
+        if current.readonly and not readonly:
+            raise RuntimeError("Cannot open a write session inside a read-only session")
+        yield current
+        return
+
+    pool = get_pool(path)
+    conn = pool.acquire()
+    if readonly:
+        conn.execute('PRAGMA query_only = 1')
+    current = Session(conn, path, readonly)
+    token = _session.set(current)
+    try:
+        _begin(conn, 'BEGIN' if readonly else 'BEGIN IMMEDIATE')
+        yield current
+        if readonly:
+            conn.rollback()  # Nothing to write; just end the read snapshot
+        else:
+            conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        _session.reset(token)
+        if readonly:
+            conn.execute('PRAGMA query_only = 0')
+        pool.release(conn)
+    if not readonly:
+        _committed(path)
+    for callback in current._after_commit:
+        callback()
+
 @contextmanager
-def get_db():
-    conn = get_connection()
+def get_db(path=None, standalone=False):
+    """Pooled connection that commits on success and rolls back on error.
+
+    Inside a session() on the same database this is the session's connection,
+    and committing is left to the session. standalone=True always takes a
+    connection of its own (for work that manages its own transaction).
+    """
+    current = _session.get()
+    if current is not None and not standalone and (path or current_db_path()) == current.path:
+        yield current.conn
+        return
+    pool = get_pool(path)
+    conn = pool.acquire()
+    committed = False
     try:
         yield conn
-        conn.commit()
+        if conn.in_transaction:  # Pure reads have nothing to commit
+            conn.commit()
+            committed = True
     except Exception:
         conn.rollback()
         raise
     finally:
-        conn.close()
+        pool.release(conn)
+    if committed:
+        _committed(pool.path)
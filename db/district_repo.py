@@ -0,0 +1,29 @@
+"""
+District-wide reads across every clinic shard.
+
+Each call fans out to all shards in parallel through db.router and merges
+the per-clinic results; every row is tagged with its clinic_id.
+"""
+import heapq
+from itertools import islice
+from db.router import fan_out
+from db.stats_repo import get_queue_stats
+from db.visit_repo import get_completed_visits, get_load_summary
+
+def get_district_completed_visits(tier=None, limit=20):
+    """Most recently completed visits across all clinics, newest first"""
+    per_clinic = fan_out(get_completed_visits, tier=tier, limit=limit)
+    tagged = [[dict(visit, clinic_id=clinic_id) for visit in visits]
+              for clinic_id, visits in per_clinic.items()]
+    # Each shard is already sorted newest first, so a k-way merge is enough
+    merged = heapq.merge(*tagged, key=lambda v: (v['completed_at'] or '', v['id']), reverse=True)
+    return list(islice(merged, limit))
+
+def get_clinic_load():
+    """Waiting (per tier) and in-progress counts for each clinic"""
+    return [dict(summary, clinic_id=clinic_id) for clinic_id, summary in fan_out(get_load_summary).items()]
+
+def get_district_queue_stats(start=None, end=None, tier=None, granularity='day'):
+    """Rollup statistics of every clinic, tagged with clinic_id"""
+    per_clinic = fan_out(get_queue_stats, start=start, end=end, tier=tier, granularity=granularity)
+    return [dict(row, clinic_id=clinic_id) for clinic_id, rows in per_clinic.items() for row in rows]
@@ -0,0 +1,268 @@
+"""
+Kiosk check-in journal.
+
+A check-in is appended (and fsynced) to a local JSONL file next to the
+database and gets a provisional token straight away; a background flusher
+then writes it to SQLite with create_visit(). Token issuance therefore never
+waits on the database write lock, e.g. during a burst of doctor-side writes.
+
+Every entry carries a unique ref that is stored in visits.journal_ref, so
+replaying the journal after a crash or restart never creates a visit twice.
+Once every entry has reached SQLite the file is truncated.
+
+Each kiosk server process writes its own journal (<db>.<pid>-<id>.journal)
+and holds an exclusive lock on it while running, so processes sharing a
+database never rewrite each other's entries. Journals whose lock is free
+were left by processes that exited with entries pending; they are adopted:
+copied into the running process's journal, then deleted. Without fcntl
+(Windows) every process shares one <db>.journal, as one process per
+database is assumed there.
+"""
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from db import connection
+from db.connection import is_busy_error
+from db.patient_repo import get_patient_by_phone, update_patient_name
+from db.visit_repo import create_visit, provisional_token
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FLUSH_INTERVAL = 1.0  # Seconds between flush attempts while entries are pending
+FLUSH_RETRY_DELAY = 2.0  # Seconds to back off after the database stayed locked
+CONFIRM_TIMEOUT = 0.5  # How long a kiosk waits for the real visit id before using the provisional token
+MAX_REMEMBERED = 1000  # Flushed ref -> visit id (and rejected ref -> error) mappings kept for wait_for()
+ORPHAN_SCAN_INTERVAL = 60.0  # Seconds between looks for journals of exited processes
+
+class CheckinRejected(RuntimeError):
+    """A journaled check-in that SQLite refused for good (not just busy); it was set aside in .rejected"""
+
+def _read_entries(f):
+    entries = []
+    for line in f:
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError:
+            pass  # Torn final line from a crash mid-append
+    return entries
+
+class CheckinJournal:
+    """Append-only check-in log for one database file, drained by a daemon thread"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One flusher at a time keeps entries in order
+        self._flushed = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._pending = deque()
+        self._visit_ids = OrderedDict()
+        self._rejected = OrderedDict()
+        self._thread = None
+        self._orphans_checked = time.monotonic()
+        if fcntl is None:
+            self.path = db_path + '.journal'
+            self._pending.extend(self._replay())
+            self._file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self.path = f'{db_path}.{os.getpid()}-{uuid.uuid4().hex[:8]}.journal'
+            # Created and locked under a name adopt_orphans() does not look at, then renamed
+            # into place: other processes never see this journal unlocked
+            creating = self.path + '-new'
+            fd = os.open(creating, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            os.rename(creating, self.path)
+            # Held open (and locked) for the life of the journal: the lock tells other processes we are alive
+            self._file = os.fdopen(fd, 'a', encoding='utf-8')
+            self.adopt_orphans()
+
+    def _replay(self):
+        """Entries left in the shared journal by a previous run (already-written ones are skipped by journal_ref)"""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding='utf-8') as f:
+            entries = _read_entries(f)
+        # Rewrite without the torn line so new appends start on a clean line
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry) + '\n' for entry in entries)
+            f.flush()
+            os.fsync(f.fileno())
+        return entries
+
+    def adopt_orphans(self):
+        """Take over the entries of journals whose process has exited; returns how many were adopted"""
+        adopted = 0
+        for path in glob.glob(glob.escape(self.db_path) + '.*.journal'):
+            if path == self.path:
+                continue
+            try:
+                with open(path, 'r+', encoding='utf-8') as f:
+                    try:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue  # Its process is still running
+                    if os.fstat(f.fileno()).st_ino != os.stat(path).st_ino:
+                        continue  # Adopted and deleted by another process while we opened it
+                    entries = _read_entries(f)
+                    if entries:
+                        with self._lock:
+                            self._write_lines(entries)  # Durable here before the orphan goes away
+                            self._pending.extend(entries)
+                        adopted += len(entries)
+                    os.remove(path)
+            except FileNotFoundError:
+                continue
+        if adopted:
+            print(f"Check-in journal adopted {adopted} pending entries from exited processes")
+            self._start()
+            self._wake.set()
+        return adopted
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='checkin-journal', daemon=True)
+            self._thread.start()
+
+    def append(self, checkin):
+        """Durably record a check-in and return its ref"""
+        entry = dict(checkin, ref=uuid.uuid4().hex)
+        with self._lock:
+            self._write_lines([entry])
+            self._pending.append(entry)
+            self._start()
+        self._wake.set()
+        return entry['ref']
+
+    def wait_for(self, ref, timeout):
+        """Visit id for a ref once it is in SQLite, or None if not flushed within timeout.
+
+        Raises CheckinRejected if the flusher could not write the entry.
+        """
+        with self._flushed:
+            self._flushed.wait_for(lambda: ref in self._visit_ids or ref in self._rejected, timeout)
+            if ref in self._rejected:
+                raise CheckinRejected(f"Check-in could not be registered: {self._rejected[ref]}")
+            return self._visit_ids.get(ref)
+
+    def _write_lines(self, entries):
+        # Called with the lock held
+        self._file.writelines(json.dumps(entry) + '\n' for entry in entries)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _write(self, entry):
+        # One transaction per check-in: the name fix and the visit land together
+        with connection.session():
+            name = entry.get('patient_name')
+            if name:
+                patient = get_patient_by_phone(entry['patient_phone'])
+                if patient and patient.get('name') in (None, 'Unknown'):
+                    update_patient_name(entry['patient_phone'], name)
+            return create_visit(
+                entry['patient_phone'], entry['symptoms_raw'], entry['symptoms_list'],
+                entry['risk_score'], entry['risk_level'], entry['assigned_tier'],
+                entry.get('ai_summary'), journal_ref=entry['ref'],
+            )
+
+    def flush(self):
+        """Write pending entries in order; returns False if the database stayed locked"""
+        with self._flush_lock, connection.use_database(self.db_path):
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._truncate()
+                        return True
+                    entry = self._pending[0]
+                try:
+                    outcome, result = self._visit_ids, self._write(entry)
+                except sqlite3.Error as e:
+                    if is_busy_error(e):
+                        return False
+                    # Would fail on every retry and hold up the check-ins behind it
+                    self._reject(entry, e)
+                    outcome, result = self._rejected, str(e)
+                with self._flushed:
+                    self._pending.popleft()
+                    outcome[entry['ref']] = result
+                    while len(outcome) > MAX_REMEMBERED:
+                        outcome.popitem(last=False)
+                    self._flushed.notify_all()
+
+    def _reject(self, entry, error):
+        print(f"Check-in {entry['ref']} could not be written: {error}")
+        # Shared by every process: only ever appended to, never rewritten
+        with open(self.db_path + '.journal.rejected', 'a', encoding='utf-8') as f:
+            f.write(json.dumps(dict(entry, error=str(error))) + '\n')
+
+    def _truncate(self):
+        # Called with the lock held and nothing pending: every line is in SQLite
+        if os.fstat(self._file.fileno()).st_size:
+            self._file.truncate(0)
+            os.fsync(self._file.fileno())
+
+    def _run(self):
+        delay = FLUSH_INTERVAL
+        while True:
+            self._wake.wait(delay)
+            self._wake.clear()
+            try:
+                if fcntl is not None and time.monotonic() - self._orphans_checked > ORPHAN_SCAN_INTERVAL:
+                    self._orphans_checked = time.monotonic()
+                    self.adopt_orphans()
+                delay = FLUSH_INTERVAL if self.flush() else FLUSH_RETRY_DELAY
+            except Exception as e:
+                print(f"Check-in journal flush failed: {e}")
+                delay = FLUSH_RETRY_DELAY
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+def get_journal():
+    """Check-in journal for the current database file"""
+    path = connection.current_db_path()
+    journal = _journals.get(path)
+    if journal is None:
+        with _journals_lock:
+            journal = _journals.get(path)
+            if journal is None:
+                journal = _journals[path] = CheckinJournal(path)
+                if journal.pending():
+                    journal._start()
+    return journal
+
+def submit_checkin(patient_phone, symptoms_raw, symptoms_list, risk_score, risk_level, assigned_tier,
+                   ai_summary=None, patient_name=None, timeout=CONFIRM_TIMEOUT):
+    """Journal a check-in and return (visit_id, token).
+
+    visit_id is the real id if the flusher wrote the visit within timeout,
+    else None, and token is then the provisional token printed on the ticket.
+    Raises CheckinRejected if the visit could not be written within timeout
+    (e.g. a constraint failure), so the kiosk can show an error instead.
+    """
+    journal = get_journal()
+    ref = journal.append({
+        'patient_phone': patient_phone,
+        'symptoms_raw': symptoms_raw,
+        'symptoms_list': symptoms_list,
+        'risk_score': risk_score,
+        'risk_level': risk_level,
+        'assigned_tier': assigned_tier,
+        'ai_summary': ai_summary,
+        'patient_name': patient_name,
+    })
+    visit_id = journal.wait_for(ref, timeout)
+    if visit_id is not None:
+        return visit_id, f"{visit_id:08d}"
+    return None, provisional_token(ref)
@@ -0,0 +1,535 @@
+"""
+Versioned schema migrations.
+
+Each migration has a fixed version number and a checksum of its syntax
+tree, so reformatting, comments and docstrings do not count as edits.
+PRAGMA user_version records the newest applied version, and
+schema_migrations records what was applied, when, and with which checksum.
+
+migrate() is cheap when nothing is pending: it reads user_version, compares
+it with LATEST_VERSION and returns, however long the history gets. Pending
+migrations run in order inside a single BEGIN IMMEDIATE transaction, so a
+failure leaves the database at its old version. Checksums of already
+applied migrations are compared first. A migration edited after release,
+or a database from a newer deployment, is refused instead of drifting.
+
+Never edit a released migration; append a new one.
+"""
+import ast
+import hashlib
+import inspect
+import textwrap
+from collections import namedtuple
+from db.connection import get_db
+from db.wait_estimator import rebuild_service_stats
+
+Migration = namedtuple('Migration', ['version', 'name', 'apply'])
+
+class MigrationError(RuntimeError):
+    pass
+
+def _add_missing_columns(cursor, table, columns):
+    """Add columns introduced after a database file was first created"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    existing = {row[1] for row in cursor.fetchall()}
+    for name, column_type in columns:
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {column_type}')
+
+def _0001_baseline(conn):
+    """Schema as of the migration engine's introduction.
+
+    Databases created before then have user_version 0 and some subset of
+    this schema, so this one migration is idempotent and probes for missing
+    columns; every later migration can assume the exact schema before it.
+    """
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS patients (
+            phone_number TEXT PRIMARY KEY,
+            yob INTEGER NOT NULL,
+            name TEXT,
+            chronic_history TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS visits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_phone TEXT NOT NULL,
+            symptoms_raw TEXT NOT NULL,
+            symptoms_list TEXT,
+            risk_score REAL,
+            risk_level TEXT,
+            assigned_tier TEXT,
+            status TEXT DEFAULT 'WAITING',
+            ai_summary TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP,
+            doctor_notes TEXT,
+            doctor_id INTEGER,
+            claimed_at TIMESTAMP,
+            journal_ref TEXT,
+            FOREIGN KEY (patient_phone) REFERENCES patients(phone_number)
+        )
+    ''')
+    _add_missing_columns(cursor, 'visits', [
+        ('ai_summary', 'TEXT'),
+        ('completed_at', 'TIMESTAMP'),
+        ('doctor_notes', 'TEXT'),
+        ('doctor_id', 'INTEGER'),
+        ('claimed_at', 'TIMESTAMP'),
+        ('journal_ref', 'TEXT'),
+    ])
+    
+    # Indexes matching the queue/history access paths in visit_repo
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_visits_queue
+        ON visits (assigned_tier, status, risk_score DESC, created_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_visits_status_completed
+        ON visits (status, completed_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_visits_tier_completed
+        ON visits (assigned_tier, status, completed_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_visits_patient_history
+        ON visits (patient_phone, status, created_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_visits_doctor
+        ON visits (doctor_id, status)
+    ''')
+    # Makes journal replays idempotent (see db/journal.py)
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_visits_journal_ref
+        ON visits (journal_ref) WHERE journal_ref IS NOT NULL
+    ''')
+
+    # Cold storage for old COMPLETED visits (see db/archive.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS visits_archive (
+            id INTEGER PRIMARY KEY,
+            patient_phone TEXT NOT NULL,
+            symptoms_raw TEXT NOT NULL,
+            symptoms_list TEXT,
+            risk_score REAL,
+            risk_level TEXT,
+            assigned_tier TEXT,
+            status TEXT,
+            ai_summary TEXT,
+            created_at TIMESTAMP,
+            completed_at TIMESTAMP,
+            doctor_notes TEXT,
+            doctor_id INTEGER,
+            claimed_at TIMESTAMP,
+            journal_ref TEXT,
+            FOREIGN KEY (patient_phone) REFERENCES patients(phone_number)
+        )
+    ''')
+    _add_missing_columns(cursor, 'visits_archive', [
+        ('journal_ref', 'TEXT'),
+    ])
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_visits_archive_completed
+        ON visits_archive (completed_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_visits_archive_tier_completed
+        ON visits_archive (assigned_tier, completed_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_visits_archive_patient
+        ON visits_archive (patient_phone, created_at)
+    ''')
+    # Provisional ticket tokens of archived visits still resolve (see visit_repo.find_visit_id_by_token)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_visits_archive_journal_ref
+        ON visits_archive (journal_ref) WHERE journal_ref IS NOT NULL
+    ''')
+
+    # Full-text index over the free-text columns of live and archived visits.
+    # rowid is the visit id; there is deliberately no DELETE trigger because
+    # archiving deletes from visits and the text must stay searchable.
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'visits_fts'")
+    backfill_fts = cursor.fetchone() is None
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS visits_fts USING fts5(
+            symptoms_raw,
+            doctor_notes,
+            ai_summary,
+            assigned_tier UNINDEXED,
+            created_at UNINDEXED,
+            tokenize = 'porter unicode61'
+        )
+    ''')
+    if backfill_fts:
+        cursor.execute('''
+            INSERT INTO visits_fts (rowid, symptoms_raw, doctor_notes, ai_summary, assigned_tier, created_at)
+            SELECT id, symptoms_raw, doctor_notes, ai_summary, assigned_tier, created_at FROM visits
+            UNION ALL
+            SELECT id, symptoms_raw, doctor_notes, ai_summary, assigned_tier, created_at FROM visits_archive
+        ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_visits_fts_insert
+        AFTER INSERT ON visits
+        BEGIN
+            INSERT INTO visits_fts (rowid, symptoms_raw, doctor_notes, ai_summary, assigned_tier, created_at)
+            VALUES (NEW.id, NEW.symptoms_raw, NEW.doctor_notes, NEW.ai_summary, NEW.assigned_tier, NEW.created_at);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_visits_fts_update
+        AFTER UPDATE OF symptoms_raw, doctor_notes, ai_summary, assigned_tier ON visits
+        BEGIN
+            UPDATE visits_fts
+            SET symptoms_raw = NEW.symptoms_raw,
+                doctor_notes = NEW.doctor_notes,
+                ai_summary = NEW.ai_summary,
+                assigned_tier = NEW.assigned_tier
+            WHERE rowid = NEW.id;
+        END
+    ''')
+
+    # Monotonic change counter for the waiting queue, bumped by triggers so that
+    # in-memory queues in every process can tell when SQLite has moved on
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS queue_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO queue_version (id, version) VALUES (1, 0)')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_queue_version_insert
+        AFTER INSERT ON visits
+        BEGIN
+            UPDATE queue_version SET version = version + 1 WHERE id = 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_queue_version_update
+        AFTER UPDATE OF status, risk_score, assigned_tier ON visits
+        BEGIN
+            UPDATE queue_version SET version = version + 1 WHERE id = 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_queue_version_delete
+        AFTER DELETE ON visits
+        WHEN OLD.status = 'WAITING'
+        BEGIN
+            UPDATE queue_version SET version = version + 1 WHERE id = 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_queue_version_patient
+        AFTER UPDATE OF name, yob ON patients
+        BEGIN
+            UPDATE queue_version SET version = version + 1 WHERE id = 1;
+        END
+    ''')
+
+    # Waiting-visit counts per tier and risk bucket (risk_score * 100), kept
+    # current by triggers so queue rank never needs a COUNT over the queue
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'queue_counts'")
+    backfill_counts = cursor.fetchone() is None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS queue_counts (
+            assigned_tier TEXT NOT NULL,
+            risk_bucket INTEGER NOT NULL,
+            waiting INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (assigned_tier, risk_bucket)
+        ) WITHOUT ROWID
+    ''')
+    if backfill_counts:
+        cursor.execute('''
+            INSERT INTO queue_counts (assigned_tier, risk_bucket, waiting)
+            SELECT assigned_tier, CAST(COALESCE(risk_score, 0) * 100 AS INTEGER), COUNT(*)
+            FROM visits
+            WHERE status = 'WAITING' AND assigned_tier IS NOT NULL
+            GROUP BY 1, 2
+        ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_queue_counts_insert
+        AFTER INSERT ON visits
+        WHEN NEW.status = 'WAITING' AND NEW.assigned_tier IS NOT NULL
+        BEGIN
+            INSERT INTO queue_counts (assigned_tier, risk_bucket, waiting)
+            VALUES (NEW.assigned_tier, CAST(COALESCE(NEW.risk_score, 0) * 100 AS INTEGER), 1)
+            ON CONFLICT (assigned_tier, risk_bucket) DO UPDATE SET waiting = waiting + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_queue_counts_leave
+        AFTER UPDATE OF status, risk_score, assigned_tier ON visits
+        WHEN OLD.status = 'WAITING' AND OLD.assigned_tier IS NOT NULL
+        BEGIN
+            UPDATE queue_counts SET waiting = waiting - 1
+            WHERE assigned_tier = OLD.assigned_tier
+              AND risk_bucket = CAST(COALESCE(OLD.risk_score, 0) * 100 AS INTEGER);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_queue_counts_enter
+        AFTER UPDATE OF status, risk_score, assigned_tier ON visits
+        WHEN NEW.status = 'WAITING' AND NEW.assigned_tier IS NOT NULL
+        BEGIN
+            INSERT INTO queue_counts (assigned_tier, risk_bucket, waiting)
+            VALUES (NEW.assigned_tier, CAST(COALESCE(NEW.risk_score, 0) * 100 AS INTEGER), 1)
+            ON CONFLICT (assigned_tier, risk_bucket) DO UPDATE SET waiting = waiting + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_queue_counts_delete
+        AFTER DELETE ON visits
+        WHEN OLD.status = 'WAITING' AND OLD.assigned_tier IS NOT NULL
+        BEGIN
+            UPDATE queue_counts SET waiting = waiting - 1
+            WHERE assigned_tier = OLD.assigned_tier
+              AND risk_bucket = CAST(COALESCE(OLD.risk_score, 0) * 100 AS INTEGER);
+        END
+    ''')
+
+    # Rolling per-tier consultation/turnaround statistics (minutes) for wait estimates
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'service_stats'")
+    seed_service_stats = cursor.fetchone() is None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS service_stats (
+            assigned_tier TEXT PRIMARY KEY,
+            samples INTEGER NOT NULL DEFAULT 0,
+            service_mean REAL,
+            service_var REAL,
+            turnaround_mean REAL,
+            turnaround_var REAL,
+            updated_at TIMESTAMP
+        )
+    ''')
+    if seed_service_stats:
+        rebuild_service_stats(conn)
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS doctors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            role_tier TEXT NOT NULL,
+            pin_code TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def _0002_hourly_rollups(conn):
+    """Per-hour, per-tier arrivals, completions, wait histogram and risk mix.
+
+    Kept current by triggers on visits, so analytics never aggregate the
+    visits table itself. Archiving (DELETE from visits) leaves them alone.
+    Arrivals and risk mix are bucketed by check-in hour; completions and
+    waits (check-in until a doctor claimed the visit, or completed it if
+    never claimed) by completion hour. Risk mix uses the kiosk's triage
+    thresholds on risk_score.
+    """
+    hour = "strftime('%Y-%m-%d %H:00:00', {})"
+    wait = "MAX(0.0, (julianday(COALESCE({v}.claimed_at, {v}.completed_at)) - julianday({v}.created_at)) * 1440)"
+    risk = ("(COALESCE({v}.risk_score, 0) <= 0.4)",
+            "(COALESCE({v}.risk_score, 0) > 0.4 AND COALESCE({v}.risk_score, 0) <= 0.7)",
+            "(COALESCE({v}.risk_score, 0) > 0.7)")
+    bucket = "(SELECT MAX(bucket) FROM wait_buckets WHERE lower_minutes <= {})"
+
+    conn.execute('''
+        CREATE TABLE visit_stats_hourly (
+            hour TEXT NOT NULL,
+            assigned_tier TEXT NOT NULL,
+            arrivals INTEGER NOT NULL DEFAULT 0,
+            completions INTEGER NOT NULL DEFAULT 0,
+            wait_minutes_total REAL NOT NULL DEFAULT 0,
+            risk_low INTEGER NOT NULL DEFAULT 0,
+            risk_medium INTEGER NOT NULL DEFAULT 0,
+            risk_high INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (hour, assigned_tier)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE wait_buckets (
+            bucket INTEGER PRIMARY KEY,
+            lower_minutes REAL NOT NULL
+        )
+    ''')
+    conn.executemany('INSERT INTO wait_buckets (bucket, lower_minutes) VALUES (?, ?)',
+                     enumerate((0, 5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240)))
+    conn.execute('''
+        CREATE TABLE wait_histogram_hourly (
+            hour TEXT NOT NULL,
+            assigned_tier TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            visits INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (hour, assigned_tier, bucket)
+        ) WITHOUT ROWID
+    ''')
+
+    # Backfill from live and archived visits
+    history = '''
+        SELECT assigned_tier, risk_score, created_at, claimed_at, completed_at, status FROM visits
+        UNION ALL
+        SELECT assigned_tier, risk_score, created_at, claimed_at, completed_at, status FROM visits_archive
+    '''
+    conn.execute(f'''
+        INSERT INTO visit_stats_hourly (hour, assigned_tier, arrivals, risk_low, risk_medium, risk_high)
+        SELECT {hour.format('h.created_at')}, h.assigned_tier, COUNT(*),
+               SUM({risk[0].format(v='h')}), SUM({risk[1].format(v='h')}), SUM({risk[2].format(v='h')})
+        FROM ({history}) h
+        WHERE h.assigned_tier IS NOT NULL AND h.created_at IS NOT NULL
+        GROUP BY 1, 2
+    ''')
+    completed = f'''
+        FROM ({history}) h
+        WHERE h.status = 'COMPLETED' AND h.completed_at IS NOT NULL AND h.assigned_tier IS NOT NULL
+    '''
+    conn.execute(f'''
+        INSERT INTO visit_stats_hourly (hour, assigned_tier, completions, wait_minutes_total)
+        SELECT {hour.format('h.completed_at')}, h.assigned_tier, COUNT(*), SUM({wait.format(v='h')})
+        {completed}
+        GROUP BY 1, 2
+        ON CONFLICT (hour, assigned_tier) DO UPDATE SET
+            completions = excluded.completions,
+            wait_minutes_total = excluded.wait_minutes_total
+    ''')
+    conn.execute(f'''
+        INSERT INTO wait_histogram_hourly (hour, assigned_tier, bucket, visits)
+        SELECT {hour.format('h.completed_at')}, h.assigned_tier, {bucket.format(wait.format(v='h'))}, COUNT(*)
+        {completed}
+        GROUP BY 1, 2, 3
+    ''')
+
+    conn.execute(f'''
+        CREATE TRIGGER trg_rollup_arrival
+        AFTER INSERT ON visits
+        WHEN NEW.assigned_tier IS NOT NULL
+        BEGIN
+            INSERT INTO visit_stats_hourly (hour, assigned_tier, arrivals, risk_low, risk_medium, risk_high)
+            VALUES ({hour.format('COALESCE(NEW.created_at, CURRENT_TIMESTAMP)')}, NEW.assigned_tier, 1,
+                    {risk[0].format(v='NEW')}, {risk[1].format(v='NEW')}, {risk[2].format(v='NEW')})
+            ON CONFLICT (hour, assigned_tier) DO UPDATE SET
+                arrivals = arrivals + 1,
+                risk_low = risk_low + excluded.risk_low,
+                risk_medium = risk_medium + excluded.risk_medium,
+                risk_high = risk_high + excluded.risk_high;
+        END
+    ''')
+    completion = f'''
+        BEGIN
+            INSERT INTO visit_stats_hourly (hour, assigned_tier, completions, wait_minutes_total)
+            VALUES ({hour.format('NEW.completed_at')}, NEW.assigned_tier, 1, {wait.format(v='NEW')})
+            ON CONFLICT (hour, assigned_tier) DO UPDATE SET
+                completions = completions + 1,
+                wait_minutes_total = wait_minutes_total + excluded.wait_minutes_total;
+            INSERT INTO wait_histogram_hourly (hour, assigned_tier, bucket, visits)
+            VALUES ({hour.format('NEW.completed_at')}, NEW.assigned_tier,
+                    {bucket.format(wait.format(v='NEW'))}, 1)
+            ON CONFLICT (hour, assigned_tier, bucket) DO UPDATE SET visits = visits + 1;
+        END
+    '''
+    conn.execute(f'''
+        CREATE TRIGGER trg_rollup_completion
+        AFTER UPDATE OF status ON visits
+        WHEN NEW.status = 'COMPLETED' AND OLD.status IS NOT 'COMPLETED'
+         AND NEW.completed_at IS NOT NULL AND NEW.assigned_tier IS NOT NULL
+        {completion}
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER trg_rollup_completed_insert
+        AFTER INSERT ON visits
+        WHEN NEW.status = 'COMPLETED' AND NEW.completed_at IS NOT NULL AND NEW.assigned_tier IS NOT NULL
+        {completion}
+    ''')
+
+MIGRATIONS = [
+    Migration(1, 'baseline', _0001_baseline),
+    Migration(2, 'hourly_rollups', _0002_hourly_rollups),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+def _canonical(node):
+    # Like ast.dump(), but leaves out empty fields so fields added by newer Pythons don't count
+    if isinstance(node, ast.AST):
+        fields = ', '.join(f'{name}={_canonical(value)}' for name, value in ast.iter_fields(node)
+                           if value is not None and value != [])
+        return f'{type(node).__name__}({fields})'
+    if isinstance(node, list):
+        return '[' + ', '.join(_canonical(item) for item in node) + ']'
+    return repr(node)
+
+def checksum(migration):
+    """sha256 of the migration function's syntax tree, without its docstring"""
+    function = ast.parse(textwrap.dedent(inspect.getsource(migration.apply))).body[0]
+    if ast.get_docstring(function) is not None:
+        function.body = function.body[1:]
+    return hashlib.sha256(_canonical(function).encode('utf-8')).hexdigest()
+
+def _ensure_history(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            checksum TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def _check_applied(conn, current):
+    """Refuse to migrate a database whose history differs from this code"""
+    if current > LATEST_VERSION:
+        raise MigrationError(
+            f"Database is at schema version {current}, newer than this code ({LATEST_VERSION})")
+    applied = dict(conn.execute('SELECT version, checksum FROM schema_migrations').fetchall())
+    if any(version > current for version in applied):
+        raise MigrationError(f"schema_migrations lists versions past user_version {current}")
+    for migration in MIGRATIONS:
+        if migration.version > current:
+            break
+        if applied.get(migration.version) != checksum(migration):
+            raise MigrationError(
+                f"Migration {migration.version} ({migration.name}) differs from the one applied to this database")
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migration_status():
+    """[(version, name, state)] with state 'applied', 'pending' or 'modified'"""
+    with get_db() as conn:
+        current = get_schema_version(conn)
+        _ensure_history(conn)
+        applied = dict(conn.execute('SELECT version, checksum FROM schema_migrations').fetchall())
+    status = []
+    for migration in MIGRATIONS:
+        if migration.version > current:
+            state = 'pending'
+        elif applied.get(migration.version) == checksum(migration):
+            state = 'applied'
+        else:
+            state = 'modified'
+        status.append((migration.version, migration.name, state))
+    return status
+
+def migrate():
+    """Bring the current database up to LATEST_VERSION; returns the versions applied"""
+    with get_db(standalone=True) as conn:
+        if get_schema_version(conn) == LATEST_VERSION:
+            return []
+        conn.execute('BEGIN IMMEDIATE')
+        current = get_schema_version(conn)  # Another process may have migrated meanwhile
+        _ensure_history(conn)
+        _check_applied(conn, current)
+        pending = [m for m in MIGRATIONS if m.version > current]
+        for migration in pending:
+            migration.apply(conn)
+            conn.execute(
+                'INSERT INTO schema_migrations (version, name, checksum) VALUES (?, ?, ?)',
+                (migration.version, migration.name, checksum(migration))
+            )
+        conn.execute(f'PRAGMA user_version = {LATEST_VERSION:d}')
+    return [m.version for m in pending]
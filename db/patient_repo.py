@@ -1,14 +1,104 @@
-from db.connection import get_db
+import threading
+import time
+from collections import OrderedDict
+from db import connection
+from db.connection import after_commit, get_db, retry_on_busy
+
+PATIENT_COLUMNS = 'phone_number, yob, name, chronic_history, created_at'
+
+PATIENT_CACHE_SIZE = 2048
+PATIENT_CACHE_TTL = 300  # Seconds; bounds staleness from writes made by other processes
+
+class PatientCache:
+    """Bounded LRU cache with per-entry expiry and hit/miss counters"""
+
+    def __init__(self, max_size=PATIENT_CACHE_SIZE, ttl=PATIENT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+_patient_cache = PatientCache()
+
+def _cache_key(phone_number):
+    return (connection.current_db_path(), phone_number)
+
+def get_patient_cache_stats():
+    return _patient_cache.stats()
+
+def clear_patient_cache():
+    _patient_cache.clear()
+
+def _invalidate(phone_number):
+    key = _cache_key(phone_number)
+    _patient_cache.invalidate(key)
+    # Again once committed, in case another thread cached the old row meanwhile
+    after_commit(lambda: _patient_cache.invalidate(key))
+
+def _cacheable():
+    # Rows read inside a write session may still be rolled back
+    current = connection.active_session()
+    return current is None or current.readonly
 
 def get_patient_by_phone(phone_number):
+    cached = _patient_cache.get(_cache_key(phone_number))
+    if cached is not None:
+        return cached
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM patients WHERE phone_number = ?', (phone_number,))
+        cursor.execute(f'SELECT {PATIENT_COLUMNS} FROM patients WHERE phone_number = ?', (phone_number,))
         row = cursor.fetchone()
         if row:
-            return dict(row)
+            # Only hits are cached: a miss usually precedes create_patient
+            patient = dict(row)
+            if _cacheable():
+                _patient_cache.put(_cache_key(phone_number), patient)
+            return patient
         return None
 
+@retry_on_busy
 def create_patient(phone_number, yob, name=None):
     with get_db() as conn:
         cursor = conn.cursor()
@@ -16,8 +106,8 @@ def create_patient(phone_number, yob, name=None):
             'INSERT INTO patients (phone_number, yob, name) VALUES (?, ?, ?)',
             (phone_number, yob, name)
         )
-        conn.commit()
-        return get_patient_by_phone(phone_number)
+    _invalidate(phone_number)
+    return get_patient_by_phone(phone_number)
 
 def verify_patient(phone_number, yob):
     patient = get_patient_by_phone(phone_number)
@@ -25,6 +115,7 @@ def verify_patient(phone_number, yob):
         return patient
     return None
 
+@retry_on_busy
 def update_patient_name(phone_number, name):
     with get_db() as conn:
         cursor = conn.cursor()
@@ -32,10 +123,10 @@ def update_patient_name(phone_number, name):
             'UPDATE patients SET name = ? WHERE phone_number = ?',
             (name, phone_number)
         )
-        conn.commit()
+    _invalidate(phone_number)
 
 def get_all_patients():
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM patients')
+        cursor.execute(f'SELECT {PATIENT_COLUMNS} FROM patients')
         return [dict(row) for row in cursor.fetchall()]
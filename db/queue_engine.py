@@ -0,0 +1,167 @@
+"""
+In-memory priority queues for waiting visits.
+
+SQLite stays the durable log; each process keeps one heap per tier so the
+dashboard's hot reads (next patient, queue length, queue listing) never
+re-run the JOIN + ORDER BY. The `queue_version` row (bumped by triggers on
+every queue-affecting write) tells a process whether its heaps are current:
+local writes are applied incrementally, anything else triggers a reload.
+"""
+import heapq
+import threading
+from db import connection
+from db.rows import QUEUE_CARD_COLUMNS, QueueCard
+
+LOAD_WAITING_QUERY = f'''
+    SELECT {', '.join(QUEUE_CARD_COLUMNS)}
+    FROM visits
+    WHERE status = 'WAITING'
+'''
+
+def read_queue_version(conn):
+    return conn.execute('SELECT version FROM queue_version WHERE id = 1').fetchone()[0]
+
+def _priority(card):
+    # Highest risk first, then first come first served
+    return (-(card.risk_score or 0.0), card.created_at or '', card.id)
+
+class TierQueue:
+    """Heap of waiting visits (QueueCards) for one tier, with lazy deletion"""
+
+    def __init__(self, cards=()):
+        self._live = {c.id: c for c in cards}
+        self._heap = [(_priority(c), c.id, c) for c in self._live.values()]
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._live)
+
+    def _is_live(self, entry):
+        return self._live.get(entry[1]) is entry[2]
+
+    def push(self, card):
+        self._live[card.id] = card
+        heapq.heappush(self._heap, (_priority(card), card.id, card))
+
+    def discard(self, visit_id):
+        card = self._live.pop(visit_id, None)
+        # Stale heap entries are skipped on read; compact once they dominate
+        if len(self._heap) > 2 * len(self._live) + 64:
+            self._heap = [e for e in self._heap if self._is_live(e)]
+            heapq.heapify(self._heap)
+        return card
+
+    def peek(self):
+        """Highest-priority visit, O(log n) amortised"""
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][2] if self._heap else None
+
+    def top(self, k):
+        """First k visits in priority order without popping, O(k log k)"""
+        result = []
+        frontier = [(self._heap[0], 0)] if self._heap else []
+        while frontier and len(result) < k:
+            entry, i = heapq.heappop(frontier)
+            if self._is_live(entry):
+                result.append(entry[2])
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(self._heap):
+                    heapq.heappush(frontier, (self._heap[child], child))
+        return result
+
+class QueueEngine:
+    """Per-tier waiting queues for one database file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._tiers = {}
+        self._version = None  # None until the first load
+        self._stale = False
+
+    @property
+    def loaded(self):
+        return self._version is not None
+
+    def _reload(self, conn):
+        conn.execute('BEGIN')  # One snapshot for the version and the rows
+        version = read_queue_version(conn)
+        by_tier = {}
+        for row in conn.execute(LOAD_WAITING_QUERY):
+            card = QueueCard._make(row)
+            by_tier.setdefault(card.assigned_tier, []).append(card)
+        self._tiers = {tier: TierQueue(cards) for tier, cards in by_tier.items()}
+        self._version = version
+        self._stale = False
+
+    def _sync(self):
+        with connection.get_db(self.path, standalone=True) as conn:
+            version = read_queue_version(conn)
+            if self._stale or version != self._version:
+                self._reload(conn)
+
+    def _tier(self, tier):
+        with self._lock:
+            self._sync()
+            return self._tiers.get(tier) or TierQueue()
+
+    def next_visit(self, tier):
+        with self._lock:
+            return self._tier(tier).peek()
+
+    def top(self, tier, k):
+        with self._lock:
+            return self._tier(tier).top(k)
+
+    def waiting(self, tier):
+        with self._lock:
+            queue = self._tier(tier)
+            return queue.top(len(queue))
+
+    def length(self, tier):
+        with self._lock:
+            return len(self._tier(tier))
+
+    def _apply(self, version, change):
+        with self._lock:
+            if not self.loaded:
+                return
+            if self._stale or version != self._version + 1:
+                # Someone else wrote in between; the next read reloads
+                self._stale = True
+                return
+            change()
+            self._version = version
+
+    def on_insert(self, card, version):
+        """Apply a committed WAITING insert made by this process"""
+        def change():
+            if card is not None:
+                self._tiers.setdefault(card.assigned_tier, TierQueue()).push(card)
+        self._apply(version, change)
+
+    def on_remove(self, visit_id, version):
+        """Apply a committed status change that took a visit out of the queue"""
+        def change():
+            for queue in self._tiers.values():
+                if queue.discard(visit_id) is not None:
+                    return
+        self._apply(version, change)
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine():
+    """Queue engine for the current database file"""
+    path = connection.current_db_path()
+    engine = _engines.get(path)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.setdefault(path, QueueEngine(path))
+    return engine
+
+def reset_engines():
+    """Forget every loaded queue, e.g. after a database file was restored"""
+    with _engines_lock:
+        _engines.clear()
@@ -0,0 +1,154 @@
+"""
+Optional in-memory read replica for dashboard reads.
+
+With READ_REPLICA=1 a background thread keeps an in-memory copy of the
+current database. Every poll it reads PRAGMA data_version, which changes
+whenever another connection commits. On a change it copies the file into a
+fresh named in-memory database with the backup API (one step, a single
+consistent read snapshot) and publishes it. Full copies are throttled: the
+next one waits at least half the staleness bound, and longer for slow
+copies (COPY_DUTY_FACTOR), so steady inserts cannot keep the thread copying.
+
+get_read_db() serves reads from that copy while it is at most
+READ_REPLICA_MAX_STALENESS seconds (default 1) behind the file, and falls
+back to the pooled on-disk connection otherwise. Each read opens its own
+connection to the copy (shared cache), so readers never wait on each other
+or on a swap. A commit made by this process marks the copy stale until the
+next copy, so a process always reads its own writes. Replica reads never
+touch the disk or its locks. The whole database is held in RAM (twice,
+briefly, while a new copy replaces the old one), so the replica suits
+clinic-sized files (old visits are archived, see db/archive.py).
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from db import connection
+
+DEFAULT_MAX_STALENESS = 1.0  # Seconds
+COPY_DUTY_FACTOR = 20  # Wait at least this many times a copy's duration before the next one
+
+def replica_enabled():
+    return os.getenv('READ_REPLICA', '').lower() in ('1', 'true', 'yes')
+
+def max_staleness():
+    return float(os.getenv('READ_REPLICA_MAX_STALENESS') or DEFAULT_MAX_STALENESS)
+
+class ReadReplica:
+    """In-memory copy of one database file, refreshed by a daemon thread"""
+
+    def __init__(self, path, max_staleness=DEFAULT_MAX_STALENESS):
+        self.path = path
+        self.max_staleness = max_staleness
+        self.refreshes = 0
+        self._uri = None  # Current copy; readers connect to it by name
+        self._keeper = None  # Keeps the current copy alive
+        self._fresh_as_of = None  # Monotonic time the copy was known to match the file
+        self._invalidated_at = float('-inf')  # Last commit by this process
+        self._next_copy_at = 0.0
+        self._source = None
+        self._data_version = None
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='read-replica', daemon=True)
+        self._thread.start()
+
+    def invalidate(self):
+        """Stop serving the current copy: this process just committed something it does not have"""
+        self._invalidated_at = time.monotonic()
+        self._wake.set()
+
+    def _refresh(self):
+        checked_at = time.monotonic()
+        if self._source is None:
+            self._source = sqlite3.connect(self.path, timeout=connection.BUSY_TIMEOUT_MS / 1000)
+        version = self._source.execute('PRAGMA data_version').fetchone()[0]
+        if self._keeper is not None and version == self._data_version:
+            self._fresh_as_of = checked_at
+            return
+        if checked_at < self._next_copy_at:
+            return  # Throttled; readers fall back to the disk once the copy is too old
+        self.refreshes += 1
+        uri = f'file:read-replica-{id(self)}-{self.refreshes}?mode=memory&cache=shared'
+        keeper = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._source.backup(keeper)
+        copied = time.monotonic()
+        stale, self._keeper = self._keeper, keeper
+        self._uri = uri
+        self._fresh_as_of = checked_at
+        self._data_version = version
+        self._next_copy_at = copied + max(self.max_staleness / 2, COPY_DUTY_FACTOR * (copied - checked_at))
+        if stale is not None:
+            stale.close()  # Freed once the readers still on it are done
+
+    def _run(self):
+        poll = self.max_staleness / 4
+        while True:
+            try:
+                self._refresh()
+            except sqlite3.Error as e:
+                print(f"Read replica refresh failed: {e}")
+                if self._source is not None:
+                    self._source.close()
+                    self._source = None
+            self._wake.wait(poll)
+            self._wake.clear()
+
+    def age(self):
+        """Seconds since the copy was last known to match the file (None before the first copy)"""
+        fresh_as_of = self._fresh_as_of
+        return None if fresh_as_of is None else time.monotonic() - fresh_as_of
+
+    def _open_reader(self):
+        """New read-only connection to the current copy, or None if there is no fresh copy"""
+        uri, fresh_as_of = self._uri, self._fresh_as_of
+        if uri is None or fresh_as_of is None or fresh_as_of <= self._invalidated_at:
+            return None
+        if time.monotonic() - fresh_as_of > self.max_staleness:
+            return None
+        conn = sqlite3.connect(uri, uri=True)
+        if self._uri != uri:
+            # Swapped meanwhile: the copy may have been freed, leaving an empty database under its name
+            conn.close()
+            return None
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA query_only = 1')
+        return conn
+
+_replicas = {}
+_replicas_lock = threading.Lock()
+
+def get_replica():
+    """Read replica of the current database file (started on first use)"""
+    path = connection.current_db_path()
+    replica = _replicas.get(path)
+    if replica is None:
+        with _replicas_lock:
+            replica = _replicas.get(path)
+            if replica is None:
+                replica = _replicas[path] = ReadReplica(path, max_staleness())
+    return replica
+
+def _on_commit(path):
+    replica = _replicas.get(path)
+    if replica is not None:
+        replica.invalidate()
+
+connection.add_commit_listener(_on_commit)
+
+@contextmanager
+def get_read_db():
+    """Read-only connection: the in-memory replica when enabled and fresh, else the database.
+
+    Inside a session() reads stay on the session's connection and snapshot.
+    """
+    if replica_enabled() and connection.active_session() is None:
+        conn = get_replica()._open_reader()
+        if conn is not None:
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+    with connection.get_db() as conn:
+        yield conn
@@ -0,0 +1,97 @@
+"""
+Clinic router: one SQLite shard per clinic.
+
+Each booth writes to its own database file, so kiosks and doctors in
+different clinics never wait on each other's write lock. The default
+clinic keeps using connection.DB_PATH; other clinics live under
+CLINIC_DIR unless registered with an explicit path. Shards are listed in
+the CLINIC_SHARDS environment variable as `id` or `id=path`, comma
+separated, and the clinic a process serves is CLINIC_ID.
+
+Inside `with use_clinic(clinic_id):` every repo call (pools, queue engine,
+patient cache) resolves to that clinic's shard. `fan_out` runs a repo call
+on every shard in parallel for district-wide reads.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from db import connection
+from db.schema import create_tables, insert_sample_doctors
+
+DEFAULT_CLINIC = 'main'
+CLINIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'clinics')
+
+_clinics = {}  # clinic_id -> explicit path, or None for CLINIC_DIR/<id>.db
+_clinics_lock = threading.Lock()
+_initialized = set()
+_current_clinic = ContextVar('clinic_id', default=DEFAULT_CLINIC)
+
+def register_clinic(clinic_id, path=None):
+    with _clinics_lock:
+        _clinics[clinic_id] = path
+
+def _register_from_env():
+    for entry in os.getenv('CLINIC_SHARDS', '').split(','):
+        clinic_id, _, path = entry.strip().partition('=')
+        if clinic_id and clinic_id != DEFAULT_CLINIC:
+            register_clinic(clinic_id, path or None)
+
+_register_from_env()
+
+def clinic_ids():
+    """Every known clinic, default first"""
+    with _clinics_lock:
+        return [DEFAULT_CLINIC] + sorted(_clinics)
+
+def clinic_db_path(clinic_id):
+    if clinic_id == DEFAULT_CLINIC:
+        return connection.DB_PATH
+    with _clinics_lock:
+        if clinic_id not in _clinics:
+            raise KeyError(f"Unknown clinic: {clinic_id}")
+        path = _clinics[clinic_id]
+    return path or os.path.join(CLINIC_DIR, f'{clinic_id}.db')
+
+def local_clinic():
+    """The clinic this process serves (CLINIC_ID, else the default)"""
+    return os.getenv('CLINIC_ID') or DEFAULT_CLINIC
+
+def current_clinic():
+    return _current_clinic.get()
+
+def _ensure_shard(path):
+    """Create or migrate a shard's schema the first time this process touches it"""
+    if path in _initialized:
+        return
+    with _clinics_lock:
+        if path in _initialized:
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        create_tables()
+        insert_sample_doctors()
+        _initialized.add(path)
+
+@contextmanager
+def use_clinic(clinic_id):
+    """Route every repo call in this block to the clinic's shard"""
+    path = clinic_db_path(clinic_id)
+    clinic_token = _current_clinic.set(clinic_id)
+    try:
+        with connection.use_database(path):
+            _ensure_shard(path)
+            yield
+    finally:
+        _current_clinic.reset(clinic_token)
+
+def _call_in_clinic(clinic_id, fn, args, kwargs):
+    with use_clinic(clinic_id):
+        return fn(*args, **kwargs)
+
+def fan_out(fn, *args, clinics=None, **kwargs):
+    """Run a repo call on every clinic's shard in parallel; returns {clinic_id: result}"""
+    clinics = clinics or clinic_ids()
+    with ThreadPoolExecutor(max_workers=len(clinics), thread_name_prefix='clinic') as pool:
+        futures = {c: pool.submit(_call_in_clinic, c, fn, args, kwargs) for c in clinics}
+        return {c: future.result() for c, future in futures.items()}
@@ -0,0 +1,56 @@
+"""
+Per-use-case projections of a visit.
+
+Each screen gets only the columns it renders instead of `SELECT *` turned
+into a dict: queue cards carry no TEXT columns at all, history rows load
+their symptoms/summary/notes only when a doctor opens them, and the full
+consultation detail is fetched for the one visit being seen.
+"""
+from collections import namedtuple
+
+QUEUE_CARD_COLUMNS = ('id', 'assigned_tier', 'risk_score', 'risk_level', 'created_at', 'patient_phone',
+                      'journal_ref')
+QueueCard = namedtuple('QueueCard', QUEUE_CARD_COLUMNS)
+
+CONSULTATION_COLUMNS = (
+    'id', 'patient_phone', 'patient_name', 'patient_yob', 'assigned_tier', 'status',
+    'risk_score', 'risk_level', 'symptoms_raw', 'symptoms_list', 'ai_summary',
+    'doctor_id', 'claimed_at', 'created_at', 'journal_ref',
+)
+ConsultationDetail = namedtuple('ConsultationDetail', CONSULTATION_COLUMNS)
+
+HISTORY_COLUMNS = ('id', 'completed_at', 'risk_level', 'risk_score', 'patient_name', 'patient_yob', 'journal_ref')
+HISTORY_TEXT_COLUMNS = ('symptoms_raw', 'ai_summary', 'doctor_notes')
+
+def select_list(columns, alias):
+    """`v.id, v.risk_score, ...` for a projection, with patient fields taken from `p`"""
+    patient = {'patient_name': 'p.name as patient_name', 'patient_yob': 'p.yob as patient_yob'}
+    return ', '.join(patient.get(c, f'{alias}.{c}') for c in columns)
+
+class HistoryRow:
+    """One consultation-history line; heavy text columns are loaded on first access"""
+
+    __slots__ = HISTORY_COLUMNS + ('_text', '_load_text')
+
+    def __init__(self, row, load_text):
+        for column in HISTORY_COLUMNS:
+            setattr(self, column, row[column])
+        self._text = None
+        self._load_text = load_text
+
+    def _get_text(self, column):
+        if self._text is None:
+            self._text = self._load_text(self.id) or dict.fromkeys(HISTORY_TEXT_COLUMNS)
+        return self._text[column]
+
+    @property
+    def symptoms_raw(self):
+        return self._get_text('symptoms_raw')
+
+    @property
+    def ai_summary(self):
+        return self._get_text('ai_summary')
+
+    @property
+    def doctor_notes(self):
+        return self._get_text('doctor_notes')
@@ -1,48 +1,9 @@
 from db.connection import get_db
+from db.migrations import migrate
 
 def create_tables():
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS patients (
-                phone_number TEXT PRIMARY KEY,
-                yob INTEGER NOT NULL,
-                name TEXT,
-                chronic_history TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS visits (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                patient_phone TEXT NOT NULL,
-                symptoms_raw TEXT NOT NULL,
-                symptoms_list TEXT,
-                risk_score REAL,
-                risk_level TEXT,
-                assigned_tier TEXT,
-                status TEXT DEFAULT 'WAITING',
-                ai_summary TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                completed_at TIMESTAMP,
-                doctor_notes TEXT,
-                FOREIGN KEY (patient_phone) REFERENCES patients(phone_number)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS doctors (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                role_tier TEXT NOT NULL,
-                pin_code TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
+    """Create or upgrade the schema of the current database (see db/migrations.py)"""
+    return migrate()
 
 def insert_sample_doctors():
     with get_db() as conn:
@@ -59,7 +20,6 @@ def insert_sample_doctors():
                 'INSERT INTO doctors (name, role_tier, pin_code) VALUES (?, ?, ?)',
                 doctors
             )
-            conn.commit()
 
 def initialize_database():
     create_tables()
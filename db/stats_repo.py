@@ -0,0 +1,99 @@
+"""
+Queue analytics read from the hourly rollup tables (see migration 2 in
+db/migrations.py), never from visits. Cost grows with the number of
+hour/tier buckets in the requested range, not with the number of visits.
+
+Time bounds are SQLite timestamps in UTC (`'2024-06-01'` or
+`'2024-06-01 14:00:00'`); start is inclusive, end exclusive.
+"""
+from db.connection import get_db
+
+GRANULARITIES = {'hour': 'hour', 'day': 'substr(hour, 1, 10)'}
+
+def _range_filter(start, end, tier, column='hour'):
+    where, params = [], []
+    if start:
+        where.append(f'{column} >= ?')
+        params.append(start)
+    if end:
+        where.append(f'{column} < ?')
+        params.append(end)
+    if tier:
+        where.append('assigned_tier = ?')
+        params.append(tier)
+    return (' WHERE ' + ' AND '.join(where)) if where else '', params
+
+def _percentile(histogram, edges, fraction):
+    """Linear interpolation inside the bucket holding the requested fraction of visits"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    target = fraction * total
+    seen = 0
+    for bucket in sorted(histogram):
+        count = histogram[bucket]
+        if seen + count >= target:
+            lower = edges[bucket]
+            upper = edges.get(bucket + 1)
+            if upper is None:  # Open-ended last bucket
+                return lower
+            return round(lower + (upper - lower) * (target - seen) / count, 1)
+        seen += count
+    return edges[max(histogram)]
+
+def _histograms(conn, period, start, end, tier):
+    """{(period, tier): {bucket: visits}} and the bucket lower edges"""
+    edges = dict(conn.execute('SELECT bucket, lower_minutes FROM wait_buckets').fetchall())
+    where, params = _range_filter(start, end, tier)
+    histograms = {}
+    for row in conn.execute(f'''
+        SELECT {period} as period, assigned_tier, bucket, SUM(visits) as visits
+        FROM wait_histogram_hourly{where}
+        GROUP BY 1, 2, 3
+    ''', params):
+        histograms.setdefault((row['period'], row['assigned_tier']), {})[row['bucket']] = row['visits']
+    return histograms, edges
+
+def get_queue_stats(start=None, end=None, tier=None, granularity='hour'):
+    """Arrivals, completions, wait (mean/p50/p90 minutes) and risk mix per period and tier"""
+    period = GRANULARITIES[granularity]
+    where, params = _range_filter(start, end, tier)
+    with get_db() as conn:
+        rows = conn.execute(f'''
+            SELECT {period} as period, assigned_tier,
+                   SUM(arrivals) as arrivals, SUM(completions) as completions,
+                   SUM(wait_minutes_total) as wait_minutes_total,
+                   SUM(risk_low) as risk_low, SUM(risk_medium) as risk_medium, SUM(risk_high) as risk_high
+            FROM visit_stats_hourly{where}
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+        ''', params).fetchall()
+        histograms, edges = _histograms(conn, period, start, end, tier)
+
+    stats = []
+    for row in rows:
+        histogram = histograms.get((row['period'], row['assigned_tier']), {})
+        completions = row['completions']
+        stats.append({
+            'period': row['period'],
+            'assigned_tier': row['assigned_tier'],
+            'arrivals': row['arrivals'],
+            'completions': completions,
+            'wait_mean': round(row['wait_minutes_total'] / completions, 1) if completions else None,
+            'wait_p50': _percentile(histogram, edges, 0.5),
+            'wait_p90': _percentile(histogram, edges, 0.9),
+            'risk_low': row['risk_low'],
+            'risk_medium': row['risk_medium'],
+            'risk_high': row['risk_high'],
+        })
+    return stats
+
+def get_wait_percentiles(start=None, end=None, tier=None, percentiles=(0.5, 0.9)):
+    """Wait-time percentiles (minutes) over a whole range, e.g. {0.5: 12.0, 0.9: 41.5}"""
+    with get_db() as conn:
+        histograms, edges = _histograms(conn, "'all'", start, end, tier)
+    combined = {}
+    for histogram in histograms.values():
+        for bucket, visits in histogram.items():
+            combined[bucket] = combined.get(bucket, 0) + visits
+    return {p: _percentile(combined, edges, p) for p in percentiles}
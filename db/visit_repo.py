@@ -1,50 +1,258 @@
 import json
-from db.connection import get_db
+import re
+from db.connection import after_commit, get_db, retry_on_busy
+from db.queue_engine import get_engine, read_queue_version, LOAD_WAITING_QUERY
+from db.wait_estimator import record_completion, estimate_wait
+from db.archive import VISIT_COLUMNS
+from db.replica import get_read_db
+from db.rows import (
+    QueueCard, ConsultationDetail, HistoryRow,
+    CONSULTATION_COLUMNS, HISTORY_COLUMNS, HISTORY_TEXT_COLUMNS, select_list
+)
 
-def create_visit(patient_phone, symptoms_raw, symptoms_list, risk_score, risk_level, assigned_tier, ai_summary=None):
+# Ticket tokens: T-00000042 for a visit id, T-P1A2B3C4 for a journaled check-in
+TOKEN_PATTERN = re.compile(r'(?:T-)?(?:(\d{8})|P([0-9A-F]{7}))', re.IGNORECASE)
+
+def provisional_token(journal_ref):
+    """Token printed for a journaled check-in that was not in SQLite yet (see db.journal)"""
+    return 'P' + journal_ref[:7].upper()
+
+def visit_tokens(visit_id, journal_ref=None):
+    """Every ticket token that names a visit: its id, plus the provisional token of a journaled check-in"""
+    tokens = [f"T-{visit_id:08d}"]
+    if journal_ref:
+        tokens.append(f"T-{provisional_token(journal_ref)}")
+    return tokens
+
+ARCHIVE_COLUMNS = ', '.join(f'a.{c}' for c in VISIT_COLUMNS.split(', '))
+LIVE_COLUMNS = ', '.join(f'v.{c}' for c in VISIT_COLUMNS.split(', '))
+
+def _get_queue_card(conn, visit_id):
+    row = conn.execute(LOAD_WAITING_QUERY + ' AND id = ?', (visit_id,)).fetchone()
+    return QueueCard._make(row) if row else None
+
+@retry_on_busy
+def create_visit(patient_phone, symptoms_raw, symptoms_list, risk_score, risk_level, assigned_tier, ai_summary=None,
+                 journal_ref=None):
+    """Insert a WAITING visit and return its id.
+
+    With a journal_ref (see db.journal) the insert is idempotent: replaying the
+    same check-in returns the visit created the first time.
+    """
+    engine = get_engine()
     with get_db() as conn:
         cursor = conn.cursor()
+        if journal_ref is not None and not conn.in_transaction:
+            cursor.execute('BEGIN IMMEDIATE')
+        if journal_ref is not None:
+            existing = cursor.execute('SELECT id FROM visits WHERE journal_ref = ?', (journal_ref,)).fetchone()
+            if existing:
+                return existing[0]
         symptoms_json = json.dumps(symptoms_list) if isinstance(symptoms_list, list) else symptoms_list
         cursor.execute('''
-            INSERT INTO visits (patient_phone, symptoms_raw, symptoms_list, risk_score, risk_level, assigned_tier, status, ai_summary)
-            VALUES (?, ?, ?, ?, ?, ?, 'WAITING', ?)
-        ''', (patient_phone, symptoms_raw, symptoms_json, risk_score, risk_level, assigned_tier, ai_summary))
-        conn.commit()
-        return cursor.lastrowid
+            INSERT INTO visits (patient_phone, symptoms_raw, symptoms_list, risk_score, risk_level, assigned_tier, status,
+                                ai_summary, journal_ref)
+            VALUES (?, ?, ?, ?, ?, ?, 'WAITING', ?, ?)
+        ''', (patient_phone, symptoms_raw, symptoms_json, risk_score, risk_level, assigned_tier, ai_summary, journal_ref))
+        visit_id = cursor.lastrowid
+        card = _get_queue_card(conn, visit_id)
+        version = read_queue_version(conn)
+    after_commit(lambda: engine.on_insert(card, version))
+    return visit_id
 
 def get_next_visit_for_tier(tier):
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM visits 
-            WHERE assigned_tier = ? AND status = 'WAITING'
-            ORDER BY risk_score DESC, created_at ASC
-            LIMIT 1
-        ''', (tier,))
-        row = cursor.fetchone()
-        if row:
-            return dict(row)
-        return None
+    card = get_engine().next_visit(tier)
+    if card:
+        return get_visit_by_id(card.id)
+    return None
 
+@retry_on_busy
 def mark_visit_completed(visit_id, doctor_notes):
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             UPDATE visits 
             SET status = 'COMPLETED', doctor_notes = ?, completed_at = CURRENT_TIMESTAMP
-            WHERE id = ?
+            WHERE id = ? AND status != 'COMPLETED'
         ''', (doctor_notes, visit_id))
-        conn.commit()
+        if cursor.rowcount != 1:
+            return  # Already completed (retried request): keep completed_at and the statistics as they are
+        record_completion(conn, visit_id)
+        version = read_queue_version(conn)
+    after_commit(lambda: get_engine().on_remove(visit_id, version))
+
+@retry_on_busy
+def claim_visit(visit_id, doctor_id):
+    """Atomically move a WAITING visit to IN_PROGRESS for a doctor.
+
+    Returns the claimed visit, or None if another doctor got there first.
+    """
+    with get_db() as conn:
+        rows = conn.execute('''
+            UPDATE visits
+            SET status = 'IN_PROGRESS', doctor_id = ?, claimed_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'WAITING'
+            RETURNING *
+        ''', (doctor_id, visit_id)).fetchall()
+        version = read_queue_version(conn)
+    if not rows:
+        return None
+    after_commit(lambda: get_engine().on_remove(visit_id, version))
+    return dict(rows[0])
+
+@retry_on_busy
+def claim_next_visit(tier, doctor_id):
+    """Atomically claim the highest-priority WAITING visit of a tier (None if queue is empty)"""
+    with get_db() as conn:
+        rows = conn.execute('''
+            UPDATE visits
+            SET status = 'IN_PROGRESS', doctor_id = ?, claimed_at = CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM visits
+                WHERE assigned_tier = ? AND status = 'WAITING'
+                ORDER BY risk_score DESC, created_at ASC, id ASC
+                LIMIT 1
+            )
+            RETURNING *
+        ''', (doctor_id, tier)).fetchall()
+        version = read_queue_version(conn)
+    if not rows:
+        return None
+    visit = dict(rows[0])
+    after_commit(lambda: get_engine().on_remove(visit['id'], version))
+    return visit
+
+@retry_on_busy
+def release_visit(visit_id, doctor_id):
+    """Put a claimed visit back in the queue (e.g. doctor skipped it)"""
+    engine = get_engine()
+    with get_db() as conn:
+        cursor = conn.execute('''
+            UPDATE visits
+            SET status = 'WAITING', doctor_id = NULL, claimed_at = NULL
+            WHERE id = ? AND status = 'IN_PROGRESS' AND doctor_id = ?
+        ''', (visit_id, doctor_id))
+        if cursor.rowcount == 0:
+            return False
+        card = _get_queue_card(conn, visit_id)
+        version = read_queue_version(conn)
+    after_commit(lambda: engine.on_insert(card, version))
+    return True
+
+CONSULTATION_QUERY = f'''
+    SELECT {select_list(CONSULTATION_COLUMNS, 'v')}
+    FROM visits v
+    LEFT JOIN patients p ON v.patient_phone = p.phone_number
+'''
+
+def get_consultation_detail(visit_id):
+    """Everything the consultation panel shows for one visit"""
+    with get_db() as conn:
+        row = conn.execute(CONSULTATION_QUERY + ' WHERE v.id = ?', (visit_id,)).fetchone()
+        return ConsultationDetail._make(row) if row else None
+
+def get_doctor_active_visit(doctor_id):
+    """Get the visit a doctor has claimed but not completed yet"""
+    with get_db() as conn:
+        row = conn.execute(CONSULTATION_QUERY + '''
+            WHERE v.doctor_id = ? AND v.status = 'IN_PROGRESS'
+            ORDER BY v.claimed_at ASC
+            LIMIT 1
+        ''', (doctor_id,)).fetchone()
+        return ConsultationDetail._make(row) if row else None
+
+def get_queue_version():
+    """Monotonic change stamp of the queue (bumped by triggers on every queue write).
+
+    Callers that poll can compare it with the last value they rendered and
+    skip re-querying when it has not moved.
+    """
+    with get_db() as conn:
+        return read_queue_version(conn)
 
 def get_queue_position(assigned_tier):
+    return get_engine().length(assigned_tier)
+
+def get_queue_rank(visit_id):
+    """1-based position of a waiting visit in its tier, honouring risk priority.
+
+    Whole risk buckets ahead come from the trigger-maintained queue_counts
+    table; only the visit's own bucket is counted row by row. Returns None
+    if the visit is no longer waiting.
+    """
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT COUNT(*) as position FROM visits 
-            WHERE assigned_tier = ? AND status = 'WAITING'
-        ''', (assigned_tier,))
-        result = cursor.fetchone()
-        return result['position'] if result else 0
+            SELECT id, assigned_tier, COALESCE(risk_score, 0) as risk_score, created_at,
+                   CAST(COALESCE(risk_score, 0) * 100 AS INTEGER) as risk_bucket
+            FROM visits
+            WHERE id = ? AND status = 'WAITING'
+        ''', (visit_id,))
+        visit = cursor.fetchone()
+        if not visit:
+            return None
+        cursor.execute('''
+            SELECT COALESCE(SUM(waiting), 0) FROM queue_counts
+            WHERE assigned_tier = ? AND risk_bucket > ?
+        ''', (visit['assigned_tier'], visit['risk_bucket']))
+        ahead = cursor.fetchone()[0]
+        # Range bounds keep the index scan to this bucket (widened for float rounding)
+        cursor.execute('''
+            SELECT COUNT(*) FROM visits
+            WHERE assigned_tier = :tier AND status = 'WAITING'
+              AND risk_score >= :risk AND risk_score < :upper
+              AND CAST(COALESCE(risk_score, 0) * 100 AS INTEGER) = :bucket
+              AND (risk_score > :risk
+                   OR created_at < :created_at
+                   OR (created_at = :created_at AND id < :id))
+        ''', {
+            'tier': visit['assigned_tier'],
+            'risk': visit['risk_score'],
+            'upper': (visit['risk_bucket'] + 2) / 100,
+            'bucket': visit['risk_bucket'],
+            'created_at': visit['created_at'],
+            'id': visit['id'],
+        })
+        ahead += cursor.fetchone()[0]
+        return ahead + 1
+
+def get_wait_estimate(visit_id):
+    """Queue rank plus (p50, p90) minutes until a waiting visit is seen"""
+    rank = get_queue_rank(visit_id)
+    if rank is None:
+        return None
+    visit = get_visit_by_id(visit_id)
+    p50, p90 = estimate_wait(visit['assigned_tier'], rank - 1)
+    return {'queue_position': rank, 'wait_p50': p50, 'wait_p90': p90}
+
+def get_provisional_wait_estimate(tier):
+    """Wait estimate for a check-in that is not in the visits table yet (journaled).
+
+    Counts everyone already waiting in the tier as ahead, since its risk
+    position is only known once the visit is written.
+    """
+    ahead = get_queue_position(tier)
+    p50, p90 = estimate_wait(tier, ahead)
+    return {'queue_position': ahead + 1, 'wait_p50': p50, 'wait_p90': p90}
+
+def get_top_waiting_visits(tier, k):
+    """Get the k highest-priority waiting visits for a tier (QueueCards)"""
+    return get_engine().top(tier, k)
+
+def get_queue_cards(tier):
+    """Get the live queue of a tier as QueueCards, in priority order"""
+    return get_engine().waiting(tier)
+
+def get_load_summary():
+    """Waiting visits per tier and consultations in progress, for load dashboards"""
+    with get_db() as conn:
+        waiting = dict(conn.execute('''
+            SELECT assigned_tier, SUM(waiting) FROM queue_counts GROUP BY assigned_tier
+        ''').fetchall())
+        in_progress = conn.execute('''
+            SELECT COUNT(*) FROM visits WHERE status = 'IN_PROGRESS'
+        ''').fetchone()[0]
+    return {'waiting': waiting, 'in_progress': in_progress}
 
 def verify_doctor(role_tier, pin_code):
     with get_db() as conn:
@@ -58,63 +266,210 @@ def verify_doctor(role_tier, pin_code):
             return dict(row)
         return None
 
-def get_visit_by_id(visit_id):
+def find_visit_id_by_token(token):
+    """Visit id (live or archived) named by a ticket token, or None"""
+    match = TOKEN_PATTERN.fullmatch(token.strip())
+    if not match:
+        return None
+    if match.group(1):
+        visit_id = int(match.group(1))
+        return visit_id if get_visit_by_id(visit_id) else None
+    # journal_ref is lowercase hex: the range covers every ref with the token's prefix
+    low = match.group(2).lower()
+    high = low + 'g'
     with get_db() as conn:
+        row = conn.execute('''
+            SELECT id FROM visits WHERE journal_ref >= ? AND journal_ref < ?
+            UNION ALL
+            SELECT id FROM visits_archive WHERE journal_ref >= ? AND journal_ref < ?
+            ORDER BY id DESC
+            LIMIT 1
+        ''', (low, high, low, high)).fetchone()
+    return row[0] if row else None
+
+def _find_visit(db, visit_id):
+    with db() as conn:
         cursor = conn.cursor()
         cursor.execute('SELECT * FROM visits WHERE id = ?', (visit_id,))
         row = cursor.fetchone()
+        if row is None:
+            cursor.execute('SELECT * FROM visits_archive WHERE id = ?', (visit_id,))
+            row = cursor.fetchone()
         if row:
             return dict(row)
         return None
 
+def get_visit_by_id(visit_id):
+    # A visit created within the replica's staleness window is only on disk
+    return _find_visit(get_read_db, visit_id) or _find_visit(get_db, visit_id)
+
 def get_previous_visits(patient_phone, limit=5):
-    """Get previous completed visits for a patient"""
+    """Get previous completed visits for a patient (live and archived)"""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM visits 
+        cursor.execute(f'''
+            SELECT {VISIT_COLUMNS} FROM visits
             WHERE patient_phone = ? AND status = 'COMPLETED'
+            UNION ALL
+            SELECT {VISIT_COLUMNS} FROM visits_archive
+            WHERE patient_phone = ?
             ORDER BY created_at DESC
             LIMIT ?
-        ''', (patient_phone, limit))
+        ''', (patient_phone, patient_phone, limit))
         rows = cursor.fetchall()
         return [dict(row) for row in rows]
 
 def get_waiting_visits(tier):
-    """Get all waiting visits for a specific tier (for live queue)"""
+    """Get all waiting visits for a specific tier as dicts of the queue-card fields"""
+    return [card._asdict() for card in get_engine().waiting(tier)]
+
+def get_visit_text(visit_id):
+    """Load the heavy TEXT columns of one visit (live or archived)"""
+    columns = ', '.join(HISTORY_TEXT_COLUMNS)
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT v.*, p.name as patient_name, p.yob as patient_yob
+        row = conn.execute(f'''
+            SELECT {columns} FROM visits WHERE id = ?
+            UNION ALL
+            SELECT {columns} FROM visits_archive WHERE id = ?
+            LIMIT 1
+        ''', (visit_id, visit_id)).fetchone()
+        return dict(row) if row else None
+
+def _completed_page(columns, tier, cursor, limit, db=get_db):
+    """Rows of one history page (newest first) plus the cursor of the next one"""
+    live_where = ["v.status = 'COMPLETED'"]
+    archive_where = ['a.completed_at IS NOT NULL']
+    live_params = []
+    archive_params = []
+    if tier:
+        live_where.append('v.assigned_tier = ?')
+        archive_where.append('a.assigned_tier = ?')
+        live_params.append(tier)
+        archive_params.append(tier)
+    if cursor:
+        completed_at, visit_id = cursor
+        # completed_at <= ? is the index range; the OR only filters the boundary rows
+        for where, params, alias in ((live_where, live_params, 'v'), (archive_where, archive_params, 'a')):
+            where.append(f'{alias}.completed_at <= ? AND ({alias}.completed_at < ? OR {alias}.id < ?)')
+            params.extend([completed_at, completed_at, visit_id])
+
+    # CROSS JOIN pins the archive as the outer loop; a young, empty archive has
+    # no statistics and the planner would otherwise scan patients
+    with db() as conn:
+        rows = conn.execute(f'''
+            SELECT {select_list(columns, 'v')}
             FROM visits v
             JOIN patients p ON v.patient_phone = p.phone_number
-            WHERE v.assigned_tier = ? AND v.status = 'WAITING'
-            ORDER BY v.risk_score DESC, v.created_at ASC
-        ''', (tier,))
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+            WHERE {' AND '.join(live_where)}
+            UNION ALL
+            SELECT {select_list(columns, 'a')}
+            FROM visits_archive a
+            CROSS JOIN patients p ON a.patient_phone = p.phone_number
+            WHERE {' AND '.join(archive_where)}
+            ORDER BY completed_at DESC, id DESC
+            LIMIT ?
+        ''', (*live_params, *archive_params, limit + 1)).fetchall()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1]['completed_at'], rows[-1]['id'])
 
 def get_completed_visits(tier=None, limit=20):
-    """Get recently completed visits (consultation history)"""
+    """Get recently completed visits (consultation history, live and archived)"""
+    columns = tuple(VISIT_COLUMNS.split(', ')) + ('patient_name', 'patient_yob')
+    rows, _ = _completed_page(columns, tier, None, limit, db=get_read_db)
+    return [dict(row) for row in rows]
+
+def get_completed_visits_page(tier=None, cursor=None, limit=20):
+    """Get one page of consultation history as HistoryRows, newest first.
+
+    Keyset pagination on (completed_at, id): pass the returned cursor back
+    to get the next page. Each page costs the same however deep it is.
+    Symptoms, AI summary and notes are only loaded for rows that are opened.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    rows, next_cursor = _completed_page(HISTORY_COLUMNS, tier, cursor, limit, db=get_read_db)
+    return [HistoryRow(row, get_visit_text) for row in rows], next_cursor
+
+def _fts_match(text):
+    """Quote each search word so user input can never be parsed as FTS5 syntax"""
+    terms = ['"' + term.replace('"', '""') + '"' for term in text.split()]
+    if not terms:
+        return None
+    terms[-1] += ' *'  # Prefix-match the word still being typed
+    return ' '.join(terms)
+
+SEARCH_HIT_COLUMNS = ('id', 'status', 'assigned_tier', 'created_at', 'completed_at',
+                      'risk_level', 'risk_score', 'patient_name', 'patient_yob', 'journal_ref')
+
+def _search_details(conn, ids):
+    placeholders = ', '.join('?' * len(ids))
+    return {row['id']: dict(row) for row in conn.execute(f'''
+        SELECT {select_list(SEARCH_HIT_COLUMNS, 'v')}
+        FROM visits v
+        LEFT JOIN patients p ON v.patient_phone = p.phone_number
+        WHERE v.id IN ({placeholders})
+        UNION ALL
+        SELECT {select_list(SEARCH_HIT_COLUMNS, 'a')}
+        FROM visits_archive a
+        LEFT JOIN patients p ON a.patient_phone = p.phone_number
+        WHERE a.id IN ({placeholders})
+    ''', ids + ids)}
+
+def search_visits(query, tier=None, date_range=None, limit=20, offset=0):
+    """Full-text search over symptoms, doctor notes and AI summaries (live and archived).
+
+    Results are ranked by bm25 (symptoms and notes weigh more than the AI
+    summary). date_range is an optional (start, end) pair of 'YYYY-MM-DD'
+    dates, both inclusive, on the check-in date.
+    Returns (hits, has_more); each hit is a dict with the history fields plus
+    `rank` and a highlighted `snippet`. A ticket token as the query (T-00000042,
+    T-P1A2B3C4) returns just the visit it names, if it passes the same filters.
+    """
+    token_visit = find_visit_id_by_token(query or '')
+    if token_visit is not None:
+        with get_db() as conn:
+            hit = _search_details(conn, [token_visit])[token_visit]
+        checked_in = hit['created_at'][:10]
+        if offset or (tier and hit['assigned_tier'] != tier) or (
+                date_range and not str(date_range[0]) <= checked_in <= str(date_range[1])):
+            return [], False
+        return [{**hit, 'rank': 0.0, 'snippet': ''}], False
+
+    match = _fts_match(query or '')
+    if not match:
+        return [], False
+
+    where = ['visits_fts MATCH ?']
+    params = [match]
+    if tier:
+        where.append('assigned_tier = ?')
+        params.append(tier)
+    if date_range:
+        start, end = date_range
+        where.append("created_at >= ? AND created_at < date(?, '+1 day')")
+        params.extend([str(start), str(end)])
+
     with get_db() as conn:
-        cursor = conn.cursor()
-        if tier:
-            cursor.execute('''
-                SELECT v.*, p.name as patient_name, p.yob as patient_yob
-                FROM visits v
-                JOIN patients p ON v.patient_phone = p.phone_number
-                WHERE v.assigned_tier = ? AND v.status = 'COMPLETED'
-                ORDER BY v.completed_at DESC, v.id DESC
-                LIMIT ?
-            ''', (tier, limit))
-        else:
-            cursor.execute('''
-                SELECT v.*, p.name as patient_name, p.yob as patient_yob
-                FROM visits v
-                JOIN patients p ON v.patient_phone = p.phone_number
-                WHERE v.status = 'COMPLETED'
-                ORDER BY v.completed_at DESC, v.id DESC
-                LIMIT ?
-            ''', (limit,))
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        matches = conn.execute(f'''
+            SELECT rowid as id,
+                   bm25(visits_fts, 2.0, 2.0, 1.0) as rank,
+                   snippet(visits_fts, -1, '<mark>', '</mark>', '…', 12) as snippet
+            FROM visits_fts
+            WHERE {' AND '.join(where)}
+            ORDER BY rank
+            LIMIT ? OFFSET ?
+        ''', (*params, limit + 1, offset)).fetchall()
+        has_more = len(matches) > limit
+        matches = matches[:limit]
+        if not matches:
+            return [], False
+
+        details = _search_details(conn, [m['id'] for m in matches])
+
+    hits = []
+    for m in matches:
+        if m['id'] in details:
+            hits.append({**details[m['id']], 'rank': m['rank'], 'snippet': m['snippet']})
+    return hits, has_more
@@ -0,0 +1,118 @@
+"""
+Rolling per-tier service-time statistics and wait-time estimates.
+
+Each completed visit updates an exponentially weighted mean/variance of
+its consultation time (claim -> complete, or check-in -> complete for
+visits that were never claimed) and of its total turnaround. Both the
+update and the estimate are O(1) and live in SQLite, so the doctor server
+that completes visits and the kiosk that quotes waits share one view.
+"""
+import math
+from db.connection import get_db
+
+EWMA_ALPHA = 0.1
+DEFAULT_SERVICE_MINUTES = 8.0  # Prior until a tier has real completions
+MIN_SAMPLE_MINUTES = 0.5
+MAX_SAMPLE_MINUTES = 180.0  # Visits left open for hours would swamp the average
+MIN_RELATIVE_SD = 0.25
+Z_P90 = 1.2816
+
+SERVICE_DURATIONS_QUERY = '''
+    SELECT assigned_tier,
+           (julianday(completed_at) - julianday(COALESCE(claimed_at, created_at))) * 1440 as service,
+           (julianday(completed_at) - julianday(created_at)) * 1440 as turnaround
+    FROM visits
+'''
+
+def _clip(minutes):
+    return min(max(minutes, MIN_SAMPLE_MINUTES), MAX_SAMPLE_MINUTES)
+
+def _ewma(mean, var, sample):
+    if mean is None:
+        return sample, 0.0
+    diff = sample - mean
+    increment = EWMA_ALPHA * diff
+    return mean + increment, (1 - EWMA_ALPHA) * (var + diff * increment)
+
+def _update(conn, tier, service, turnaround):
+    row = conn.execute(
+        'SELECT * FROM service_stats WHERE assigned_tier = ?', (tier,)
+    ).fetchone()
+    stats = dict(row) if row else {
+        'samples': 0, 'service_mean': None, 'service_var': None,
+        'turnaround_mean': None, 'turnaround_var': None,
+    }
+    service_mean, service_var = _ewma(stats['service_mean'], stats['service_var'], _clip(service))
+    turnaround_mean, turnaround_var = _ewma(
+        stats['turnaround_mean'], stats['turnaround_var'], _clip(turnaround)
+    )
+    conn.execute('''
+        INSERT INTO service_stats (assigned_tier, samples, service_mean, service_var,
+                                   turnaround_mean, turnaround_var, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (assigned_tier) DO UPDATE SET
+            samples = excluded.samples,
+            service_mean = excluded.service_mean,
+            service_var = excluded.service_var,
+            turnaround_mean = excluded.turnaround_mean,
+            turnaround_var = excluded.turnaround_var,
+            updated_at = excluded.updated_at
+    ''', (tier, stats['samples'] + 1, service_mean, service_var, turnaround_mean, turnaround_var))
+
+def record_completion(conn, visit_id):
+    """Fold a just-completed visit into its tier's statistics (inside the caller's transaction)"""
+    row = conn.execute(
+        SERVICE_DURATIONS_QUERY + " WHERE id = ? AND status = 'COMPLETED'", (visit_id,)
+    ).fetchone()
+    if row and row['assigned_tier'] and row['service'] is not None:
+        _update(conn, row['assigned_tier'], row['service'], row['turnaround'])
+
+def rebuild_service_stats(conn, history=500):
+    """Seed the statistics from the most recent completions of each tier"""
+    conn.execute('DELETE FROM service_stats')
+    tiers = [r[0] for r in conn.execute(
+        "SELECT DISTINCT assigned_tier FROM visits WHERE assigned_tier IS NOT NULL"
+    )]
+    for tier in tiers:
+        rows = conn.execute(SERVICE_DURATIONS_QUERY + '''
+            WHERE id IN (
+                SELECT id FROM visits
+                WHERE assigned_tier = ? AND status = 'COMPLETED' AND completed_at IS NOT NULL
+                ORDER BY completed_at DESC
+                LIMIT ?
+            )
+            ORDER BY completed_at ASC
+        ''', (tier, history)).fetchall()
+        for row in rows:
+            if row['service'] is not None:
+                _update(conn, tier, row['service'], row['turnaround'])
+
+def get_service_stats(tier):
+    with get_db() as conn:
+        row = conn.execute(
+            'SELECT * FROM service_stats WHERE assigned_tier = ?', (tier,)
+        ).fetchone()
+        return dict(row) if row else None
+
+def estimate_wait(tier, ahead):
+    """Estimate (p50, p90) minutes until a patient with `ahead` patients before them is seen.
+
+    The tier's doctors work in parallel; the doctor currently consulting is
+    assumed to be half way through on average. Waits are treated as a sum
+    of independent consultation times (normal approximation).
+    """
+    with get_db() as conn:
+        row = conn.execute(
+            'SELECT service_mean, service_var FROM service_stats WHERE assigned_tier = ?', (tier,)
+        ).fetchone()
+        doctors = conn.execute(
+            'SELECT COUNT(*) FROM doctors WHERE role_tier = ?', (tier,)
+        ).fetchone()[0]
+
+    mean = row['service_mean'] if row and row['service_mean'] is not None else DEFAULT_SERVICE_MINUTES
+    sd = max(math.sqrt(row['service_var'] or 0.0) if row else 0.0, MIN_RELATIVE_SD * mean)
+    slots = max(ahead, 0) / max(doctors, 1) + 0.5
+
+    p50 = slots * mean
+    p90 = p50 + Z_P90 * math.sqrt(slots) * sd
+    return round(p50), round(p90)
@@ -0,0 +1,200 @@
+"""
+Flattened tree ensembles evaluated with NumPy.
+
+flatten_forest() copies every tree of a fitted sklearn forest (or single
+tree) regressor into contiguous node arrays: feature, threshold, children
+(right and left child side by side) and value, plus the root node of each
+tree. A batch walks every (row, tree) pair one level per step; pairs that
+reach a leaf drop out of the working set, so each step only gathers for
+pairs still inside a tree.
+
+The arrays are saved as an uncompressed .npz whose members are padded so
+every array starts 64-byte aligned. load_forest() maps each member straight
+out of the zip by its offset and copies it into memory in one pass, so
+loading costs no unpickling and needs neither sklearn nor a matching
+sklearn version. The copies (a few MB) keep a loaded forest intact when
+its file is later overwritten in place; mmap=True keeps the arrays as
+views of the file instead. np.load() reads the file as a normal .npz.
+
+Predictions are bit-identical to sklearn: inputs are cast to float32 and
+compared against float64 thresholds, as sklearn's trees do, and per-tree
+values are summed in tree order before dividing by the number of trees.
+"""
+import os
+import struct
+import zipfile
+import numpy as np
+
+FORMAT_VERSION = 1
+ALIGNMENT = 64  # Array data offsets in the .npz; unaligned arrays take NumPy's slow gather paths
+PADDING_EXTRA_ID = 0xD935  # Zip extra field used for alignment padding (as Android's zipalign)
+ZIP64_LOCAL_EXTRA = 20  # Bytes zipfile appends to the local header of a zip64 member
+BATCH_ROWS = 4096  # Rows walked at once; bounds the (rows x trees) node index arrays
+
+# Node indexes are stored as int64: NumPy gathers with native-width indexes are faster
+ARRAYS = ('feature', 'threshold', 'children', 'value', 'roots')
+
+class FlatForest:
+    """Tree ensemble regressor held as flat node arrays"""
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth, n_features, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children  # [node] -> (right, left); leaves point at themselves
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features_in_ = n_features
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=str)
+        self._next = children.reshape(-1)  # _next[2 * node + went_left]
+        self._is_leaf = children[:, 0] == np.arange(len(children))
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected rows of {self.n_features_in_} features, got shape {X.shape}")
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), BATCH_ROWS):
+            out[start:start + BATCH_ROWS] = self._predict_rows(X[start:start + BATCH_ROWS])
+        return out
+
+    def _predict_rows(self, X):
+        n_rows, n_trees = len(X), self.n_trees
+        flat = np.ascontiguousarray(X).reshape(-1)
+        # One entry per (row, tree) pair still inside its tree
+        node = np.tile(self.roots, n_rows)
+        row_base = np.repeat(np.arange(n_rows) * X.shape[1], n_trees)
+        pair = np.arange(n_rows * n_trees)
+        leaf = node.copy()  # Final for trees that are a single leaf
+        for _ in range(self.max_depth):
+            if not len(node):
+                break
+            went_left = flat[row_base + self.feature[node]] <= self.threshold[node]
+            node = self._next[2 * node + went_left]
+            done = self._is_leaf[node]
+            leaf[pair[done]] = node[done]
+            active = ~done
+            node, row_base, pair = node[active], row_base[active], pair[active]
+        leaf_values = self.value[leaf].reshape(n_rows, n_trees)
+        total = np.zeros(n_rows, dtype=np.float64)
+        for tree in range(n_trees):  # Tree order, as sklearn accumulates
+            total += leaf_values[:, tree]
+        return total / n_trees
+
+    def save(self, path):
+        """Write an uncompressed .npz (renamed into place, so readers never see half a file)"""
+        path = os.fspath(path)
+        arrays = {name: getattr(self, name) for name in ARRAYS}
+        arrays['meta'] = np.array([FORMAT_VERSION, self.n_features_in_, self.max_depth], dtype=np.int64)
+        names = getattr(self, 'feature_names_in_', None)
+        if names is not None:
+            arrays['feature_names'] = np.asarray(names, dtype=str)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f, zipfile.ZipFile(f, 'w', zipfile.ZIP_STORED) as archive:
+            for name, array in arrays.items():
+                _write_member(archive, f, name, array)
+        os.replace(tmp, path)
+
+def _write_member(archive, f, name, array):
+    info = zipfile.ZipInfo(name + '.npy', date_time=(1980, 1, 1, 0, 0, 0))
+    zip64 = array.nbytes > zipfile.ZIP64_LIMIT // 2
+    data_offset = f.tell() + 30 + len(info.filename.encode()) + (ZIP64_LOCAL_EXTRA if zip64 else 0)
+    # .npy headers are padded to a multiple of 64 bytes, so aligning the member aligns the array
+    padding = -(data_offset + 4) % ALIGNMENT
+    info.extra = struct.pack('<HH', PADDING_EXTRA_ID, padding) + bytes(padding)
+    with archive.open(info, 'w', force_zip64=zip64) as member:
+        np.lib.format.write_array(member, np.ascontiguousarray(array), allow_pickle=False)
+
+def flatten_forest(model):
+    """FlatForest copy of a fitted sklearn forest or tree regressor"""
+    from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+    from sklearn.tree import DecisionTreeRegressor
+
+    if isinstance(model, (RandomForestRegressor, ExtraTreesRegressor)):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+    elif isinstance(model, DecisionTreeRegressor):  # Also ExtraTreeRegressor
+        trees = [model.tree_]
+    else:
+        raise TypeError(f"Cannot flatten {type(model).__name__}")
+    if model.n_outputs_ != 1:
+        raise TypeError("Only single-output regressors can be flattened")
+
+    parts = {name: [] for name in ARRAYS}
+    offset = 0
+    for tree in trees:
+        nodes = np.arange(tree.node_count)
+        leaf = tree.children_left == -1
+        parts['feature'].append(np.where(leaf, 0, tree.feature))
+        parts['threshold'].append(tree.threshold)
+        parts['children'].append(np.column_stack([np.where(leaf, nodes, tree.children_right),
+                                                  np.where(leaf, nodes, tree.children_left)]) + offset)
+        parts['value'].append(tree.value[:, 0, 0])
+        parts['roots'].append([offset])
+        offset += tree.node_count
+
+    return FlatForest(
+        feature=np.concatenate(parts['feature']).astype(np.int64),
+        threshold=np.concatenate(parts['threshold']).astype(np.float64),
+        children=np.concatenate(parts['children']).astype(np.int64),
+        value=np.concatenate(parts['value']).astype(np.float64),
+        roots=np.concatenate(parts['roots']).astype(np.int64),
+        max_depth=max(tree.max_depth for tree in trees),
+        n_features=model.n_features_in_,
+        feature_names=getattr(model, 'feature_names_in_', None),
+    )
+
+def _map_member(f, info):
+    """Memory-map one .npy member of an uncompressed zip, or None if it cannot be mapped"""
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+    f.seek(info.header_offset)
+    local_header = f.read(30)
+    name_length = int.from_bytes(local_header[26:28], 'little')
+    extra_length = int.from_bytes(local_header[28:30], 'little')
+    f.seek(info.header_offset + 30 + name_length + extra_length)
+    major, _ = np.lib.format.read_magic(f)
+    read_header = np.lib.format.read_array_header_1_0 if major == 1 else np.lib.format.read_array_header_2_0
+    shape, fortran_order, dtype = read_header(f)
+    if dtype.hasobject or not shape or 0 in shape:
+        return None
+    mapped = np.memmap(f, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                       order='F' if fortran_order else 'C')
+    return np.asarray(mapped)  # Plain ndarray view of the mapping; memmap indexing is slower
+
+def load_forest(file, mmap=False):
+    """Load a FlatForest from a path or binary file object.
+
+    With mmap=True the arrays stay memory-mapped: the file must then not be
+    rewritten while the forest is in use (a truncated file raises SIGBUS).
+    """
+    own = isinstance(file, (str, os.PathLike))
+    f = open(file, 'rb') if own else file
+    try:
+        arrays = {}
+        with zipfile.ZipFile(f) as archive:
+            for info in archive.infolist():
+                name = info.filename[:-len('.npy')]
+                array = _map_member(f, info)
+                if array is not None and not mmap:
+                    array = array.copy()  # Detach from the file
+                if array is None:
+                    with archive.open(info) as member:
+                        array = np.lib.format.read_array(member, allow_pickle=False)
+                arrays[name] = array
+    finally:
+        if own:
+            f.close()  # Mappings keep their own handle
+
+    missing = [name for name in ARRAYS + ('meta',) if name not in arrays]
+    if missing:
+        raise ValueError(f"Not a flattened forest, missing {', '.join(missing)}")
+    version, n_features, max_depth = (int(x) for x in arrays['meta'])
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported forest format version {version}")
+    return FlatForest(*(arrays[name] for name in ARRAYS), max_depth=max_depth, n_features=n_features,
+                      feature_names=arrays.get('feature_names'))
@@ -1,66 +1,246 @@
+import hashlib
+import os
 import pickle
 import re
-import pandas as pd
+import threading
+import time
+import numpy as np
 import warnings
+from collections import namedtuple
 from pathlib import Path
+from ml.forest import flatten_forest, load_forest
 
-# Suppress sklearn version warnings for clean demo output
-warnings.filterwarnings('ignore', category=UserWarning, module='sklearn')
-
-# Model path
+# Model paths: the flattened forest is preferred, the pickle is the fallback
 MODEL_PATH = Path(__file__).parent / 'risk_model.pkl'
+FOREST_PATH = Path(__file__).parent / 'risk_model.npz'
+
+RELOAD_CHECK_INTERVAL = 1.0  # Seconds between stat() calls looking for a new model file
+
+FEATURE_NAMES = ['age_normalized', 'chest_pain', 'breathing_difficulty',
+                 'fever', 'headache', 'emergency_keywords']
+
+# Kiosk age input range (whole years); every other feature is a 0/1 flag
+AGE_MIN = 0
+AGE_MAX = 120
+
+class GridScorer:
+    """The forest's prediction for every kiosk input, computed once.
+
+    With whole-year ages in AGE_MIN..AGE_MAX and 5 binary flags there are only
+    121 x 32 distinct feature rows. They are all scored in one predict call
+    and kept as a float64 table, so a prediction is one index and is
+    bit-identical to asking the forest. Inputs off the grid (fractional or
+    out-of-range ages) are left to the forest.
+    """
+
+    FLAG_WEIGHTS = 1 << np.arange(len(FEATURE_NAMES) - 2, -1, -1)  # First flag is the high bit
+    FLAG_COMBINATIONS = 1 << len(FLAG_WEIGHTS)
+
+    def __init__(self, model):
+        ages = np.arange(AGE_MIN, AGE_MAX + 1)
+        flags = (np.arange(self.FLAG_COMBINATIONS)[:, None] & self.FLAG_WEIGHTS) > 0
+        X = np.empty((len(ages) * self.FLAG_COMBINATIONS, len(FEATURE_NAMES)), dtype=np.float64)
+        X[:, 0] = np.repeat(ages, self.FLAG_COMBINATIONS) / 100  # Same division as extract_features_from_symptoms
+        X[:, 1:] = np.tile(flags, (len(ages), 1))
+        self.table = np.clip(model.predict(X), 0.0, 1.0)
+
+    @staticmethod
+    def supports(model):
+        """Whether the model takes exactly the feature schema the grid enumerates"""
+        names = getattr(model, 'feature_names_in_', None)
+        return (getattr(model, 'n_features_in_', None) == len(FEATURE_NAMES)
+                and (names is None or list(names) == FEATURE_NAMES))
+
+    def index(self, X, ages):
+        """Table index per feature row, -1 where the age is off the grid"""
+        ages = np.asarray(ages, dtype=np.float64)
+        on_grid = (ages >= AGE_MIN) & (ages <= AGE_MAX) & (ages == np.floor(ages))
+        age_rows = np.where(on_grid, ages - AGE_MIN, 0).astype(np.int64)
+        flags = X[:, 1:].astype(np.int64) @ self.FLAG_WEIGHTS
+        return np.where(on_grid, age_rows * self.FLAG_COMBINATIONS + flags, -1)
+
+# version is the first 12 hex digits of the file's sha256; scorer is a GridScorer or None
+LoadedModel = namedtuple('LoadedModel', 'model version path loaded_at load_seconds scorer')
+
+def default_model_path():
+    return FOREST_PATH if FOREST_PATH.exists() else MODEL_PATH
+
+def _load_model_file(path, f, data):
+    if path.suffix == '.npz':
+        return load_forest(f)
+    with warnings.catch_warnings():
+        # Pickles from another sklearn version warn on load; the flattened copy never calls sklearn
+        warnings.simplefilter('ignore', UserWarning)
+        model = pickle.loads(data)
+    try:
+        return flatten_forest(model)
+    except TypeError:
+        return model
+
+class ModelRegistry:
+    """Keeps the risk model resident and swaps in a new one when the file changes.
+
+    The model file is FOREST_PATH (a flattened forest, see ml/forest.py;
+    its arrays are copied into memory) when it exists, else the MODEL_PATH pickle, which is
+    flattened on load. Either way predictions run without sklearn.
+
+    The file is stat()ed at most every RELOAD_CHECK_INTERVAL seconds. A new
+    path, mtime or size triggers a hash; only different contents are loaded.
+    The new model is built completely before it replaces the old one, so a
+    caller always sees one whole model. A file that fails to load keeps the
+    previous model in service, as does a model file that has gone missing.
+    """
+
+    def __init__(self, path=None, check_interval=RELOAD_CHECK_INTERVAL):
+        self.path = Path(path) if path else None  # None follows default_model_path()
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._lock = threading.Lock()  # One loader at a time
+        self._current = None
+        self._signature = None  # (path, mtime_ns, size) of the loaded file
+        self._next_check = 0.0
+
+    def _maybe_reload(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._current is not None and now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            path = self.path or default_model_path()
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                self._keep_current("Risk model file unavailable", e)
+                return
+            signature = (path, stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature:
+                return
+            started = time.perf_counter()
+            try:
+                f = open(path, 'rb')
+            except OSError as e:  # Removed since the stat
+                self._keep_current("Risk model file unavailable", e)
+                return
+            with f:
+                data = f.read()
+                version = hashlib.sha256(data).hexdigest()[:12]
+                if self._current is not None and version == self._current.version:
+                    self._signature = signature  # Touched, not changed
+                    return
+                try:
+                    model = _load_model_file(path, f, data)  # Maps the file that was hashed
+                    scorer = GridScorer(model) if GridScorer.supports(model) else None
+                except Exception as e:
+                    self._keep_current("Risk model reload failed", e)
+                    self._signature = signature
+                    return
+            self._current = LoadedModel(model, version, str(path), time.time(),
+                                        time.perf_counter() - started, scorer)
+            self._signature = signature
+            self.reloads += 1
+
+    def _keep_current(self, message, error):
+        # A check that fails keeps the resident model in service; with none loaded yet there is nothing to serve
+        if self._current is None:
+            raise error
+        print(f"{message}, keeping {self._current.version}: {error}")
+
+    def current(self):
+        """The resident LoadedModel, reloading first if the file has changed"""
+        if self._current is None or time.monotonic() >= self._next_check:
+            self._maybe_reload()
+        return self._current
+
+_registry = ModelRegistry()
+
+def get_registry():
+    return _registry
+
+def use_model_file(path):
+    """Serve predictions from another model file (benchmarks, tooling)"""
+    global _registry
+    _registry = ModelRegistry(path)
 
 def load_model():
-    with open(MODEL_PATH, 'rb') as f:
-        return pickle.load(f)
+    return _registry.current().model
+
+def model_info():
+    """Version, path, load time (epoch seconds), load duration and scorer of the resident model"""
+    loaded = _registry.current()
+    return {
+        'version': loaded.version,
+        'path': loaded.path,
+        'loaded_at': loaded.loaded_at,
+        'load_seconds': loaded.load_seconds,
+        'scorer': 'grid' if loaded.scorer is not None else 'forest',
+    }
+
+# Critical/Emergency keywords that should trigger high risk
+CRITICAL_KEYWORDS = (
+    'heart attack', 'stroke', 'unconscious', 'bleeding', 'hemorrhage',
+    'cancer', 'tumor', 'malignant', 'carcinoma', 'oncology',
+    'hiv', 'aids', 'seizure', 'convulsion', 'paralysis', 'paralyzed',
+    'suicide', 'overdose', 'poisoning', 'sepsis', 'septic',
+    'aneurysm', 'embolism', 'thrombosis', 'infarction',
+    'trauma', 'fracture', 'severe', 'critical', 'emergency',
+    'life-threatening', 'code blue', 'cardiac arrest', 'respiratory failure',
+    'organ failure', 'kidney failure', 'liver failure', 'coma',
+    'stabbing', 'gunshot', 'accident', 'collision'
+)
+
+# Severity indicators
+SEVERITY_WORDS = ('severe', 'extreme', 'intense', 'unbearable', 'excruciating',
+                  'massive', 'heavy', 'critical', 'acute', 'sudden')
+
+CHEST_WORDS = ('chest', 'heart', 'cardiac')
+BREATHING_WORDS = ('breath', 'breathing', 'shortness')
+FEVER_WORDS = ('fever', 'temperature', 'hot')
+HEADACHE_WORDS = ('head', 'headache', 'migraine')
+
+def _has_any(text, words):
+    return 1 if any(word in text for word in words) else 0
 
 def extract_features_from_symptoms(symptoms_text, age):
-    """Extract binary features from symptom text"""
+    """Extract binary features from symptom text (in FEATURE_NAMES order)"""
     text_lower = symptoms_text.lower()
-    
-    # Critical/Emergency keywords that should trigger high risk
-    critical_keywords = [
-        'heart attack', 'stroke', 'unconscious', 'bleeding', 'hemorrhage',
-        'cancer', 'tumor', 'malignant', 'carcinoma', 'oncology',
-        'hiv', 'aids', 'seizure', 'convulsion', 'paralysis', 'paralyzed',
-        'suicide', 'overdose', 'poisoning', 'sepsis', 'septic',
-        'aneurysm', 'embolism', 'thrombosis', 'infarction',
-        'trauma', 'fracture', 'severe', 'critical', 'emergency',
-        'life-threatening', 'code blue', 'cardiac arrest', 'respiratory failure',
-        'organ failure', 'kidney failure', 'liver failure', 'coma',
-        'stabbing', 'gunshot', 'accident', 'collision'
+    return [
+        age / 100,
+        _has_any(text_lower, CHEST_WORDS),
+        _has_any(text_lower, BREATHING_WORDS),
+        _has_any(text_lower, FEVER_WORDS),
+        _has_any(text_lower, HEADACHE_WORDS),
+        _has_any(text_lower, CRITICAL_KEYWORDS) or _has_any(text_lower, SEVERITY_WORDS),
     ]
-    
-    # Check for critical conditions
-    has_critical = any(keyword in text_lower for keyword in critical_keywords)
-    
-    # Severity indicators
-    severity_words = ['severe', 'extreme', 'intense', 'unbearable', 'excruciating', 
-                     'massive', 'heavy', 'critical', 'acute', 'sudden']
-    has_severity = any(word in text_lower for word in severity_words)
-    
-    features = {
-        'age_normalized': age / 100,
-        'chest_pain': 1 if any(word in text_lower for word in ['chest', 'heart', 'cardiac']) else 0,
-        'breathing_difficulty': 1 if any(word in text_lower for word in ['breath', 'breathing', 'shortness']) else 0,
-        'fever': 1 if any(word in text_lower for word in ['fever', 'temperature', 'hot']) else 0,
-        'headache': 1 if any(word in text_lower for word in ['head', 'headache', 'migraine']) else 0,
-        'emergency_keywords': 1 if has_critical or has_severity else 0
-    }
-    
-    return list(features.values())
+
+def extract_features_batch(texts, ages):
+    """Feature matrix (len(texts) x len(FEATURE_NAMES)) filled in place, no DataFrame"""
+    X = np.empty((len(texts), len(FEATURE_NAMES)), dtype=np.float64)
+    for i, (text, age) in enumerate(zip(texts, ages)):
+        X[i] = extract_features_from_symptoms(text, age)
+    return X
+
+def _predict_forest(model, X):
+    return np.clip(model.predict(X), 0.0, 1.0)
+
+def predict_risk_scores(texts, ages):
+    """Risk scores in [0, 1] for many visits with one model.predict call"""
+    if len(texts) != len(ages):
+        raise ValueError(f"Got {len(texts)} texts but {len(ages)} ages")
+    if not len(texts):
+        return np.empty(0)
+    X = extract_features_batch(texts, ages)
+    loaded = _registry.current()
+    if loaded.scorer is None:
+        return _predict_forest(loaded.model, X)
+    index = loaded.scorer.index(X, ages)
+    scores = loaded.scorer.table[index]
+    off_grid = index < 0
+    if off_grid.any():
+        scores[off_grid] = _predict_forest(loaded.model, X[off_grid])
+    return scores
 
 def predict_risk_score(symptoms_text, age):
-    model = load_model()
-    features = extract_features_from_symptoms(symptoms_text, age)
-    
-    # Use DataFrame to maintain feature names (avoids sklearn warnings)
-    feature_names = ['age_normalized', 'chest_pain', 'breathing_difficulty', 
-                     'fever', 'headache', 'emergency_keywords']
-    features_df = pd.DataFrame([features], columns=feature_names)
-    
-    risk_score = model.predict(features_df)[0]
-    return max(0.0, min(1.0, risk_score))
+    return float(predict_risk_scores([symptoms_text], [age])[0])
 
 # Test function
 if __name__ == "__main__":
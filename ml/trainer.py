@@ -1,73 +1,140 @@
+import argparse
+import os
+import pickle
+import time
+from pathlib import Path
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
-import pickle
+from ml.forest import flatten_forest
+from ml.model import FEATURE_NAMES, FOREST_PATH, MODEL_PATH
+
+# Parquet output is optional
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+CHUNK_ROWS = 1_000_000  # Rows per generated chunk / output file (~56 MB as float64)
+
+# P(flag = 1) for each binary symptom feature
+FLAG_PROBABILITIES = {
+    'chest_pain': 0.2,
+    'breathing_difficulty': 0.15,
+    'fever': 0.3,
+    'headache': 0.4,
+    'emergency_keywords': 0.05,
+}
+
+def generate_arrays(n_samples, rng):
+    """Synthetic features (n_samples x FEATURE_NAMES, float64) and risk scores, drawn as whole arrays"""
+    age = rng.integers(18, 80, n_samples)
+    flags = {name: rng.random(n_samples) < p for name, p in FLAG_PROBABILITIES.items()}
+
+    # Emergency keywords should dominate the risk score: 0.85-1.0 for emergencies
+    emergency_score = 0.85 + rng.uniform(0, 0.15, n_samples)
+    score = age / 100 * 0.25  # Age factor (0-0.25)
+    score += flags['chest_pain'] * 0.35  # Chest pain (0-0.35)
+    score += flags['breathing_difficulty'] * 0.25  # Breathing (0-0.25)
+    score += flags['fever'] * 0.05  # Fever (0-0.05)
+    score += flags['headache'] * 0.03  # Headache (0-0.03)
+    score += rng.normal(0, 0.05, n_samples)  # Add some noise
+    y = np.clip(np.where(flags['emergency_keywords'], emergency_score, score), 0.0, 1.0)
+
+    X = np.empty((n_samples, len(FEATURE_NAMES)), dtype=np.float64)
+    X[:, 0] = age / 100
+    for column, name in enumerate(FEATURE_NAMES[1:], start=1):
+        X[:, column] = flags[name]
+    return X, y
+
+def iter_training_chunks(n_samples, seed=42, chunk_rows=CHUNK_ROWS):
+    """(X, y) chunks of at most chunk_rows rows; only one chunk is in memory at a time"""
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_samples, chunk_rows):
+        yield generate_arrays(min(chunk_rows, n_samples - start), rng)
 
 # Generate synthetic training data
-def generate_training_data(n_samples=1000):
-    np.random.seed(42)
-    data = []
-    
-    for _ in range(n_samples):
-        age = np.random.randint(18, 80)
-        
-        # Symptom features (binary)
-        chest_pain = np.random.choice([0, 1], p=[0.8, 0.2])
-        breathing_difficulty = np.random.choice([0, 1], p=[0.85, 0.15])
-        fever = np.random.choice([0, 1], p=[0.7, 0.3])
-        headache = np.random.choice([0, 1], p=[0.6, 0.4])
-        emergency_keywords = np.random.choice([0, 1], p=[0.95, 0.05])
-        
-        # Calculate risk score based on features
-        # Emergency keywords should dominate the risk score
-        if emergency_keywords == 1:
-            risk_score = 0.85 + np.random.uniform(0, 0.15)  # 0.85-1.0 for emergencies
+def generate_training_data(n_samples=1000, seed=42):
+    X, y = generate_arrays(n_samples, np.random.default_rng(seed))
+    df = pd.DataFrame(X, columns=FEATURE_NAMES)
+    df[FEATURE_NAMES[1:]] = df[FEATURE_NAMES[1:]].astype(np.int8)
+    df['risk_score'] = y
+    return df
+
+def write_training_chunks(out_dir, n_samples, seed=42, chunk_rows=CHUNK_ROWS, fmt='npy'):
+    """Write generated data to out_dir in chunks for out-of-core training; returns the files written.
+
+    npy: X-00000.npy / y-00000.npy pairs (np.load(..., mmap_mode='r') reads them lazily).
+    parquet: part-00000.parquet with FEATURE_NAMES + risk_score columns (needs pyarrow).
+    """
+    if fmt == 'parquet' and pq is None:
+        raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    files = []
+    for i, (X, y) in enumerate(iter_training_chunks(n_samples, seed, chunk_rows)):
+        if fmt == 'npy':
+            for name, array in (('X', X), ('y', y)):
+                path = out_dir / f'{name}-{i:05d}.npy'
+                np.save(path, array)
+                files.append(path)
         else:
-            risk_score = 0.0
-            risk_score += age / 100 * 0.25  # Age factor (0-0.25)
-            risk_score += chest_pain * 0.35  # Chest pain (0-0.35)
-            risk_score += breathing_difficulty * 0.25  # Breathing (0-0.25)
-            risk_score += fever * 0.05  # Fever (0-0.05)
-            risk_score += headache * 0.03  # Headache (0-0.03)
-            
-            # Add some noise
-            risk_score += np.random.normal(0, 0.05)
-        
-        risk_score = max(0.0, min(1.0, risk_score))  # Clamp to [0,1]
-        
-        data.append({
-            'age_normalized': age / 100,
-            'chest_pain': chest_pain,
-            'breathing_difficulty': breathing_difficulty,
-            'fever': fever,
-            'headache': headache,
-            'emergency_keywords': emergency_keywords,
-            'risk_score': risk_score
-        })
-    
-    return pd.DataFrame(data)
+            columns = {name: X[:, column] for column, name in enumerate(FEATURE_NAMES)}
+            columns['risk_score'] = y
+            path = out_dir / f'part-{i:05d}.parquet'
+            pq.write_table(pa.table(columns), path)
+            files.append(path)
+    return files
 
 # Train model
-def train_model():
-    df = generate_training_data()
-    
-    features = ['age_normalized', 'chest_pain', 'breathing_difficulty', 
-                'fever', 'headache', 'emergency_keywords']
-    X = df[features]
+def train_model(n_samples=1000, seed=42, n_estimators=100):
+    started = time.perf_counter()
+    df = generate_training_data(n_samples, seed)
+    generated = time.perf_counter()
+    print(f"Generated {n_samples:,} samples in {generated - started:.2f}s")
+
+    X = df[FEATURE_NAMES]
     y = df['risk_score']
-    
+
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
+
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=42)
     model.fit(X_train, y_train)
-    
-    # Save model
-    with open('risk_model.pkl', 'wb') as f:
+    print(f"Trained {n_estimators} trees in {time.perf_counter() - generated:.2f}s")
+
+    # Save model; written aside and renamed so a running kiosk never loads half a file
+    tmp = f'{MODEL_PATH}.tmp'
+    with open(tmp, 'wb') as f:
         pickle.dump(model, f)
-    
+    os.replace(tmp, MODEL_PATH)
+    # Array copy the kiosk loads without pickle or sklearn (see ml/forest.py)
+    flatten_forest(model).save(FOREST_PATH)
+
     print(f"✅ Model trained! Accuracy: {model.score(X_test, y_test):.2f}")
     return model
 
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic triage data and train the risk model")
+    parser.add_argument('--samples', type=int, default=1000, help='rows to generate')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--trees', type=int, default=100, help='forest size when training')
+    parser.add_argument('--out', help='write the data to this directory in chunks instead of training')
+    parser.add_argument('--format', choices=('npy', 'parquet'), default='npy')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+    if args.out and args.format == 'parquet' and pq is None:
+        parser.error("--format parquet needs pyarrow (pip install pyarrow)")
+
+    if args.out:
+        started = time.perf_counter()
+        files = write_training_chunks(args.out, args.samples, args.seed, args.chunk_rows, args.format)
+        elapsed = time.perf_counter() - started
+        print(f"✅ Wrote {args.samples:,} samples to {len(files)} {args.format} files in {args.out} "
+              f"in {elapsed:.2f}s ({args.samples / elapsed:,.0f} rows/s)")
+    else:
+        train_model(args.samples, args.seed, args.trees)
+
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Move old completed visits out of the live visits table into visits_archive.
+
+Safe to run while the kiosk and dashboards are live: work is done in small
+batches with a pause in between. History views read both tables.
+
+Usage:
+    python scripts/archive_visits.py [--older-than-days 30] [--batch-size 500]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from db.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_PAUSE, ARCHIVE_BATCH_SIZE, archive_completed_visits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--older-than-days', type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument('--pause', type=float, default=ARCHIVE_BATCH_PAUSE,
+                        help='seconds to sleep between batches')
+    args = parser.parse_args()
+
+    try:
+        print(f"📦 Archiving visits completed more than {args.older_than_days} days ago...")
+        start = time.perf_counter()
+        moved = archive_completed_visits(args.older_than_days, args.batch_size, args.pause)
+        print(f"✅ Archived {moved:,} visits in {time.perf_counter() - start:.1f}s")
+        return 0
+    except Exception as e:
+        print(f"❌ Archiving failed: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Hot backups of the queue database.
+
+Safe to run while the kiosk and dashboards are live.
+
+Usage:
+    python scripts/backup_db.py backup [--keep 7] [--dir backups/]
+    python scripts/backup_db.py list
+    python scripts/backup_db.py verify [SNAPSHOT]      # newest if omitted
+    python scripts/backup_db.py restore SNAPSHOT
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from db.backup import (
+    BACKUP_DIR, KEEP_SNAPSHOTS,
+    backup_database, list_snapshots, restore_snapshot, verify_snapshot
+)
+
+
+def show_progress(copied, total):
+    print(f"\r   {copied:,}/{total:,} pages ({copied / total:.0%})", end='', flush=True)
+
+
+def cmd_backup(args):
+    print("💾 Backing up database...")
+    start = time.perf_counter()
+    snapshot = backup_database(args.dir, keep=args.keep, progress=show_progress)
+    print()
+    print(f"✅ Snapshot written in {time.perf_counter() - start:.1f}s: {snapshot}")
+    return 0
+
+
+def cmd_list(args):
+    snapshots = list_snapshots(args.dir)
+    if not snapshots:
+        print("No snapshots found")
+    for path in snapshots:
+        print(f"  {path}  ({Path(path).stat().st_size / 1024 / 1024:.1f} MiB)")
+    return 0
+
+
+def _pick(args):
+    if args.snapshot:
+        return args.snapshot
+    snapshots = list_snapshots(args.dir)
+    if not snapshots:
+        raise FileNotFoundError("No snapshots found")
+    return snapshots[0]
+
+
+def cmd_verify(args):
+    snapshot = _pick(args)
+    ok, details = verify_snapshot(snapshot)
+    if not ok:
+        print(f"❌ {snapshot} is damaged:")
+        for problem in details:
+            print(f"   {problem}")
+        return 1
+    print(f"✅ {snapshot} is intact")
+    for table, count in details.items():
+        print(f"   {table:<16} {count:,} rows")
+    return 0
+
+
+def cmd_restore(args):
+    print(f"♻️  Restoring {args.snapshot}...")
+    restore_snapshot(args.snapshot)
+    print("✅ Database restored")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dir', default=BACKUP_DIR, help='snapshot directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    backup = commands.add_parser('backup', help='take a compressed snapshot')
+    backup.add_argument('--keep', type=int, default=KEEP_SNAPSHOTS, help='snapshots to keep')
+    backup.set_defaults(run=cmd_backup)
+
+    commands.add_parser('list', help='list snapshots, newest first').set_defaults(run=cmd_list)
+
+    verify = commands.add_parser('verify', help='integrity-check a snapshot')
+    verify.add_argument('snapshot', nargs='?')
+    verify.set_defaults(run=cmd_verify)
+
+    restore = commands.add_parser('restore', help='restore the database from a snapshot')
+    restore.add_argument('snapshot')
+    restore.set_defaults(run=cmd_restore)
+
+    args = parser.parse_args()
+    try:
+        return args.run(args)
+    except Exception as e:
+        print(f"❌ {args.command} failed: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
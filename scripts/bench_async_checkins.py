@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Concurrent check-in benchmark: sync repo API vs db.async_repo.
+
+Each simulated check-in registers the patient, waits on a stand-in for the
+LLM triage call, creates the visit and reads back the wait estimate. The
+sync run drives the plain repo functions from a pool of kiosk threads; the
+async run drives db.async_repo from one event loop, where the LLM waits
+overlap and all writes funnel through the single writer thread.
+
+Usage:
+    python scripts/bench_async_checkins.py [--checkins 500] [--concurrency 20] [--llm-ms 50]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from db import async_repo, connection, patient_repo, visit_repo
+from db.schema import create_tables
+
+TIERS = ('JUNIOR', 'SENIOR')
+
+
+def checkin_args(i, prefix):
+    phone = f'{prefix}{i:09d}'
+    return phone, ('fever and cough', '["fever", "cough"]', (i % 100) / 100, 'LOW', TIERS[i % 2])
+
+
+def sync_checkin(i, llm_seconds):
+    start = time.perf_counter()
+    phone, visit = checkin_args(i, 8)
+    if patient_repo.get_patient_by_phone(phone) is None:
+        patient_repo.create_patient(phone, 1980, f'Sync {i}')
+    time.sleep(llm_seconds)
+    visit_id = visit_repo.create_visit(phone, *visit)
+    visit_repo.get_wait_estimate(visit_id)
+    return time.perf_counter() - start
+
+
+async def async_checkin(i, llm_seconds, limit):
+    async with limit:
+        start = time.perf_counter()
+        phone, visit = checkin_args(i, 7)
+        if await async_repo.get_patient_by_phone(phone) is None:
+            await async_repo.create_patient(phone, 1980, f'Async {i}')
+        await asyncio.sleep(llm_seconds)
+        visit_id = await async_repo.create_visit(phone, *visit)
+        await async_repo.get_wait_estimate(visit_id)
+        return time.perf_counter() - start
+
+
+def run_sync(n, concurrency, llm_seconds):
+    with ThreadPoolExecutor(max_workers=concurrency) as kiosks:
+        return list(kiosks.map(lambda i: sync_checkin(i, llm_seconds), range(n)))
+
+
+async def run_async(n, concurrency, llm_seconds):
+    limit = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(async_checkin(i, llm_seconds, limit) for i in range(n)))
+
+
+def report(name, latencies, elapsed):
+    ms = sorted(l * 1000 for l in latencies)
+    p95 = ms[int(len(ms) * 0.95) - 1]
+    print(f"  {name:<6} {len(ms) / elapsed:8.1f} check-ins/s   "
+          f"p50 {statistics.median(ms):7.1f} ms   p95 {p95:7.1f} ms   max {ms[-1]:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--checkins', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--llm-ms', type=float, default=50,
+                        help='simulated triage latency per check-in')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='aarogya-bench-')
+    connection.DB_PATH = str(Path(workdir) / 'bench.db')
+    create_tables()
+    llm_seconds = args.llm_ms / 1000
+
+    print(f"{args.checkins:,} check-ins, {args.concurrency} concurrent, {args.llm_ms:g} ms simulated triage")
+
+    start = time.perf_counter()
+    sync_latencies = run_sync(args.checkins, args.concurrency, llm_seconds)
+    report('sync', sync_latencies, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    async_latencies = asyncio.run(run_async(args.checkins, args.concurrency, llm_seconds))
+    report('async', async_latencies, time.perf_counter() - start)
+
+    async_repo.shutdown_executor()
+    connection.close_connections()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Queue-query latency while an online backup is running.
+
+Seeds a throwaway database of the requested size (2 GB by default, padded
+consultation notes), then runs a kiosk/dashboard mix (queue rank, history
+page, check-in write) first on its own and then while backup_database()
+copies the file. Prints p50/p99/max latency for both phases.
+
+Usage:
+    python scripts/bench_backup_latency.py [--size-gb 2] [--pages 1024] [--pause 0.005]
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from db import connection, visit_repo
+from db.backup import backup_database
+from db.schema import create_tables
+
+TIERS = ('JUNIOR', 'SENIOR')
+NOTE_BYTES = 2000
+
+
+def seed(size_gb, batch=20_000):
+    """Insert visits in batches until the file reaches size_gb; returns the WAITING ids"""
+    rng = random.Random(7)
+    note = 'x' * NOTE_BYTES
+    target = size_gb * 1024 ** 3
+
+    def visits(offset):
+        for i in range(offset, offset + batch):
+            waiting = i % 1000 == 0
+            created = f'2024-{1 + i % 12:02d}-{1 + i % 28:02d} {8 + i % 10:02d}:{i % 60:02d}:00'
+            yield ('9000000000', 'fever', rng.random(), 'LOW', TIERS[i % 2],
+                   'WAITING' if waiting else 'COMPLETED', created, None if waiting else created,
+                   None if waiting else note)
+
+    with connection.get_db() as conn:
+        conn.execute("INSERT INTO patients (phone_number, yob, name) VALUES ('9000000000', 1970, 'Bench')")
+    offset = 0
+    while Path(connection.DB_PATH).stat().st_size < target:
+        with connection.get_db() as conn:
+            conn.executemany('''
+                INSERT INTO visits (patient_phone, symptoms_raw, risk_score, risk_level, assigned_tier,
+                                    status, created_at, completed_at, doctor_notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', visits(offset))
+        offset += batch
+    with connection.get_db() as conn:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.execute('ANALYZE')
+        return [row[0] for row in conn.execute("SELECT id FROM visits WHERE status = 'WAITING'")]
+
+
+def workload(waiting_ids, stop, samples):
+    rng = random.Random(1)
+    ops = [
+        ('get_queue_rank', lambda: visit_repo.get_queue_rank(rng.choice(waiting_ids))),
+        ('get_completed_visits_page', lambda: visit_repo.get_completed_visits_page(tier=rng.choice(TIERS))),
+        ('create_visit', lambda: visit_repo.create_visit('9000000000', 'cough', '[]', rng.random(),
+                                                         'LOW', rng.choice(TIERS))),
+    ]
+    while not stop.is_set():
+        for name, op in ops:
+            start = time.perf_counter()
+            op()
+            samples.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+        time.sleep(0.01)  # Roughly a busy clinic, not a tight loop
+
+
+def measure(waiting_ids, during=None, seconds=None):
+    stop = threading.Event()
+    samples = {}
+    worker = threading.Thread(target=workload, args=(waiting_ids, stop, samples))
+    worker.start()
+    start = time.perf_counter()
+    if during:
+        during()
+    else:
+        time.sleep(seconds)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worker.join()
+    return samples, elapsed
+
+
+def report(title, samples):
+    print(title)
+    for name, ms in samples.items():
+        ms = sorted(ms)
+        p99 = ms[max(0, int(len(ms) * 0.99) - 1)]
+        print(f"  {name:<28} n={len(ms):<6} p50 {statistics.median(ms):7.2f} ms   "
+              f"p99 {p99:7.2f} ms   max {ms[-1]:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-gb', type=float, default=2.0)
+    parser.add_argument('--pages', type=int, default=1024, help='pages copied per backup step')
+    parser.add_argument('--pause', type=float, default=0.005, help='seconds slept between backup steps')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='aarogya-bench-')
+    connection.DB_PATH = str(Path(workdir) / 'bench.db')
+    create_tables()
+
+    print(f"Seeding ~{args.size_gb:g} GB...")
+    start = time.perf_counter()
+    waiting_ids = seed(args.size_gb)
+    size = Path(connection.DB_PATH).stat().st_size / 1024 ** 3
+    print(f"Seeded {size:.2f} GB in {time.perf_counter() - start:.1f}s ({connection.DB_PATH})")
+    print()
+
+    snapshot = []
+    backup = lambda: snapshot.append(backup_database(str(Path(workdir) / 'backups'), args.pages, args.pause))
+    during, backup_seconds = measure(waiting_ids, during=backup)
+    baseline, _ = measure(waiting_ids, seconds=min(backup_seconds, 30))
+
+    report("Idle:", baseline)
+    report(f"During backup ({backup_seconds:.1f}s, {args.pages} pages/step):", during)
+    print()
+    print(f"Snapshot: {snapshot[0]} ({Path(snapshot[0]).stat().st_size / 1024 ** 2:.1f} MiB)")
+    connection.close_connections()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
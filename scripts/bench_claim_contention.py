@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Multi-process contention benchmark for claiming visits.
+
+Seeds a throwaway database with a WAITING queue, then lets several doctor
+processes drain it concurrently. In the default mode every doctor uses
+claim_next_visit(); with --naive they emulate the old dashboard (read the
+top of the queue, then mark it taken without a status guard), which shows
+how often two doctors end up with the same patient.
+
+Usage:
+    python scripts/bench_claim_contention.py [--doctors 4] [--visits 2000] [--naive]
+"""
+import argparse
+import multiprocessing as mp
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from db import connection
+from db.schema import create_tables
+
+TIER = 'SENIOR'
+
+
+def seed(n_visits):
+    with connection.get_db() as conn:
+        conn.execute("INSERT INTO patients (phone_number, yob, name) VALUES ('9000000000', 1970, 'Bench')")
+        conn.executemany('''
+            INSERT INTO visits (patient_phone, symptoms_raw, risk_score, risk_level, assigned_tier, status)
+            VALUES ('9000000000', 'chest pain', ?, 'HIGH', ?, 'WAITING')
+        ''', ((0.7 + (i % 300) / 1000, TIER) for i in range(n_visits)))
+
+
+def naive_claim(doctor_id):
+    """Read-then-write without a guard, as the dashboard did before claim_visit existed"""
+    with connection.get_db() as conn:
+        row = conn.execute('''
+            SELECT id FROM visits
+            WHERE assigned_tier = ? AND status = 'WAITING'
+            ORDER BY risk_score DESC, created_at ASC
+            LIMIT 1
+        ''', (TIER,)).fetchone()
+    if row is None:
+        return None
+    with connection.get_db() as conn:
+        conn.execute('''
+            UPDATE visits SET status = 'IN_PROGRESS', doctor_id = ?, claimed_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (doctor_id, row['id']))
+    return row['id']
+
+
+def doctor(db_path, doctor_id, naive, start_event, results):
+    connection.DB_PATH = db_path
+    from db.visit_repo import claim_next_visit
+
+    claimed = []
+    errors = 0
+    start_event.wait()
+    while True:
+        try:
+            if naive:
+                visit_id = naive_claim(doctor_id)
+            else:
+                visit = claim_next_visit(TIER, doctor_id)
+                visit_id = visit['id'] if visit else None
+        except Exception:
+            errors += 1
+            continue
+        if visit_id is None:
+            break
+        claimed.append(visit_id)
+    results.put((doctor_id, claimed, errors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--doctors', type=int, default=4)
+    parser.add_argument('--visits', type=int, default=2000)
+    parser.add_argument('--naive', action='store_true', help='use unguarded read-then-update claims')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='aarogya-bench-')
+    connection.DB_PATH = str(Path(workdir) / 'bench.db')
+    create_tables()
+    seed(args.visits)
+    connection.close_connections()
+
+    start_event = mp.Event()
+    results = mp.Queue()
+    procs = [
+        mp.Process(target=doctor, args=(connection.DB_PATH, i + 1, args.naive, start_event, results))
+        for i in range(args.doctors)
+    ]
+    for p in procs:
+        p.start()
+
+    start = time.perf_counter()
+    start_event.set()
+    outcomes = [results.get() for _ in procs]
+    elapsed = time.perf_counter() - start
+    for p in procs:
+        p.join()
+
+    counts = Counter(visit_id for _, claimed, _ in outcomes for visit_id in claimed)
+    duplicates = sum(1 for c in counts.values() if c > 1)
+    total = sum(counts.values())
+
+    mode = 'naive read-then-update' if args.naive else 'claim_next_visit()'
+    print(f"Mode: {mode}, {args.doctors} doctor processes, {args.visits:,} waiting visits")
+    for doctor_id, claimed, errors in sorted(outcomes):
+        print(f"  doctor {doctor_id}: {len(claimed):6,} claims, {errors} errors")
+    print(f"Claims:            {total:,} in {elapsed:.2f}s ({total / elapsed:,.0f}/s)")
+    print(f"Distinct visits:   {len(counts):,} of {args.visits:,}")
+    print(f"Double-claimed:    {duplicates:,}")
+
+    if not args.naive and (duplicates or len(counts) != args.visits):
+        print("❌ Every visit must be claimed exactly once")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression benchmark for the visits queue queries.
+
+Seeds a throwaway database with a large visits table (1M rows by default),
+runs the real visit_repo functions against it, and checks with
+EXPLAIN QUERY PLAN that none of the statements they issue falls back to a
+table scan or a temp B-tree sort. Exits non-zero on a plan regression.
+
+Usage:
+    python scripts/bench_queue_indexes.py [--visits 1000000] [--patients 20000]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from db import connection
+from db.schema import create_tables
+from db import visit_repo
+
+TIERS = ('JUNIOR', 'SENIOR')
+
+
+def seed(n_visits, n_patients):
+    rng = random.Random(42)
+    phones = [f'9{i:09d}' for i in range(n_patients)]
+
+    def visits():
+        for i in range(n_visits):
+            # Almost everything is history; a small live queue sits on top
+            waiting = rng.random() < 0.001
+            day = rng.randint(1, 28)
+            created = f'2024-{rng.randint(1, 12):02d}-{day:02d} {rng.randint(8, 18):02d}:{rng.randint(0, 59):02d}:00'
+            yield (
+                rng.choice(phones),
+                'fever and cough for two days',
+                '["fever", "cough"]',
+                rng.random(),
+                'LOW',
+                rng.choice(TIERS),
+                'WAITING' if waiting else 'COMPLETED',
+                created,
+                None if waiting else created,
+            )
+
+    with connection.get_db() as conn:
+        conn.executemany(
+            'INSERT INTO patients (phone_number, yob, name) VALUES (?, ?, ?)',
+            ((p, 1960 + i % 50, f'Patient {i}') for i, p in enumerate(phones))
+        )
+        conn.executemany('''
+            INSERT INTO visits (patient_phone, symptoms_raw, symptoms_list, risk_score, risk_level,
+                                assigned_tier, status, created_at, completed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', visits())
+        conn.execute('ANALYZE')
+    return phones
+
+
+def capture_statements(calls):
+    """Run repo calls on one traced pooled connection and return the SELECTs they issued"""
+    statements = []
+    pool = connection.get_pool()
+    conn = pool.acquire()
+    conn.set_trace_callback(statements.append)
+    pool.release(conn)
+
+    timings = []
+    for name, fn in calls:
+        start = time.perf_counter()
+        fn()
+        timings.append((name, (time.perf_counter() - start) * 1000))
+
+    conn.set_trace_callback(None)
+    selects = [s for s in statements if s.lstrip().upper().startswith('SELECT')]
+    return selects, timings
+
+
+def check_plans(statements):
+    failures = []
+    with connection.get_db() as conn:
+        for sql in statements:
+            plan = [row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+            bad = [d for d in plan if d.startswith('SCAN') or 'TEMP B-TREE' in d]
+            status = 'FAIL' if bad else 'ok'
+            print(f"[{status}] {' '.join(sql.split())[:110]}")
+            for detail in plan:
+                print(f"         {detail}")
+            if bad:
+                failures.append(sql)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--visits', type=int, default=1_000_000)
+    parser.add_argument('--patients', type=int, default=20_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='aarogya-bench-')
+    connection.DB_PATH = str(Path(workdir) / 'bench.db')
+    create_tables()
+
+    print(f"Seeding {args.visits:,} visits for {args.patients:,} patients...")
+    start = time.perf_counter()
+    phones = seed(args.visits, args.patients)
+    print(f"Seeded in {time.perf_counter() - start:.1f}s ({connection.DB_PATH})")
+    print()
+
+    calls = []
+    for tier in TIERS:
+        calls += [
+            (f'get_next_visit_for_tier({tier})', lambda t=tier: visit_repo.get_next_visit_for_tier(t)),
+            (f'get_waiting_visits({tier})', lambda t=tier: visit_repo.get_waiting_visits(t)),
+            (f'get_queue_position({tier})', lambda t=tier: visit_repo.get_queue_position(t)),
+            (f'get_completed_visits({tier})', lambda t=tier: visit_repo.get_completed_visits(tier=t)),
+        ]
+    calls += [
+        ('get_completed_visits()', lambda: visit_repo.get_completed_visits()),
+        ('get_previous_visits()', lambda: visit_repo.get_previous_visits(phones[0])),
+        ('get_completed_visits_page(deep)', lambda: visit_repo.get_completed_visits_page(
+            tier='SENIOR', cursor=('2024-06-15 12:00:00', args.visits // 2))),
+    ]
+
+    statements, timings = capture_statements(calls)
+    failures = check_plans(statements)
+
+    print()
+    print("Latency (single call, warm cache):")
+    for name, ms in timings:
+        print(f"  {name:<36} {ms:8.2f} ms")
+
+    connection.close_connections()
+    print()
+    if failures:
+        print(f"❌ {len(failures)} statement(s) scan or sort without an index")
+        return 1
+    print(f"✅ All {len(statements)} statements are served by indexes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Risk scoring benchmark: sklearn vs the flattened forest vs the grid lookup.
+
+Times five ways of scoring synthetic kiosk inputs with the same model: the
+old path (one-row pandas DataFrame into the sklearn pickle per call), the
+sklearn pickle over the whole batch, the flattened NumPy forest over the
+whole batch, predict_risk_score() per call and predict_risk_scores() over
+the whole batch (the precomputed grid when the model supports it). The
+DataFrame path only scores --single-items inputs, since it costs
+milliseconds per call. Every path must return identical scores. Also
+prints how long the pickle and the .npz take to load.
+
+Usage:
+    python scripts/bench_risk_scoring.py [--items 10000] [--single-items 200]
+                                         [--model ml/risk_model.pkl] [--forest ml/risk_model.npz]
+"""
+import argparse
+import pickle
+import random
+import sys
+import time
+import warnings
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+
+from ml import model as risk_model
+from ml.forest import load_forest
+
+PHRASES = (
+    'mild headache', 'fever and cough', 'chest pain', 'shortness of breath',
+    'severe abdominal pain', 'high temperature since yesterday', 'migraine',
+    'road accident, bleeding from head', 'sore throat', 'sudden weakness in left arm',
+)
+
+
+def make_inputs(n, seed=42):
+    rng = random.Random(seed)
+    texts = [' and '.join(rng.sample(PHRASES, rng.randint(1, 3))) for _ in range(n)]
+    ages = [rng.randint(0, 120) for _ in range(n)]
+    return texts, ages
+
+
+def legacy_score(model, text, age):
+    features = risk_model.extract_features_from_symptoms(text, age)
+    features_df = pd.DataFrame([features], columns=risk_model.FEATURE_NAMES)
+    return max(0.0, min(1.0, model.predict(features_df)[0]))
+
+
+def per_item_us(seconds, n):
+    return seconds / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--single-items', type=int, default=200)
+    parser.add_argument('--model', default=str(risk_model.MODEL_PATH), help='sklearn pickle')
+    parser.add_argument('--forest', help='flattened forest (default: the pickle, flattened on load)')
+    args = parser.parse_args()
+
+    if not Path(args.model).exists():
+        print(f"❌ No model at {args.model}; train one with: python -m ml.trainer")
+        return 1
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)  # sklearn version skew, feature names
+        sklearn_model = pickle.loads(Path(args.model).read_bytes())
+    print(f"Load: pickle {(time.perf_counter() - start) * 1000:.1f} ms", end='')
+    if args.forest:
+        start = time.perf_counter()
+        load_forest(args.forest)
+        print(f", .npz {(time.perf_counter() - start) * 1000:.1f} ms", end='')
+    print()
+
+    risk_model.use_model_file(args.forest or args.model)
+    model = risk_model.load_model()
+    print(f"Model {risk_model.model_info()['version']} ({type(model).__name__}), {args.items} batch items, "
+          f"{args.single_items} per-call items")
+
+    texts, ages = make_inputs(args.items)
+    single = min(args.single_items, args.items)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        start = time.perf_counter()
+        legacy = [legacy_score(sklearn_model, t, a) for t, a in zip(texts[:single], ages[:single])]
+        legacy_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sklearn_batch = np.clip(sklearn_model.predict(risk_model.extract_features_batch(texts, ages)), 0.0, 1.0)
+        sklearn_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores = [risk_model.predict_risk_score(t, a) for t, a in zip(texts[:single], ages[:single])]
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    forest = np.clip(model.predict(risk_model.extract_features_batch(texts, ages)), 0.0, 1.0)
+    forest_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = risk_model.predict_risk_scores(texts, ages)
+    batch_s = time.perf_counter() - start
+
+    print(f"  DataFrame per call     {per_item_us(legacy_s, single):>10.1f} µs/item")
+    print(f"  predict_risk_score     {per_item_us(single_s, single):>10.1f} µs/item")
+    print(f"  sklearn batch          {per_item_us(sklearn_s, args.items):>10.1f} µs/item "
+          f"({sklearn_s * 1000:.1f} ms total)")
+    print(f"  flat forest batch      {per_item_us(forest_s, args.items):>10.1f} µs/item "
+          f"({forest_s * 1000:.1f} ms total)")
+    print(f"  predict_risk_scores    {per_item_us(batch_s, args.items):>10.1f} µs/item "
+          f"({batch_s * 1000:.1f} ms total, {risk_model.model_info()['scorer']} scorer)")
+
+    if not (np.array_equal(legacy, scores) and np.array_equal(sklearn_batch, forest)
+            and np.array_equal(batch, forest)
+            and np.array_equal(batch[:single], scores)):
+        print("❌ Scores differ between paths")
+        return 1
+    print("✅ All paths return identical scores")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,37 +1,46 @@
 #!/usr/bin/env python3
 """
-Database migration script to add ai_summary column to existing visits table
+Schema migrations for the queue database.
+
+Usage:
+    python scripts/migrate_db.py            # apply pending migrations
+    python scripts/migrate_db.py --status   # list migrations and their state
 """
-import sqlite3
+import argparse
 import sys
 from pathlib import Path
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from db.connection import get_db
+from db.migrations import LATEST_VERSION, MigrationError, migrate, migration_status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--status', action='store_true', help='show migration state without applying')
+    args = parser.parse_args()
 
-def migrate_database():
-    """Add ai_summary column if it doesn't exist"""
     try:
-        with get_db() as conn:
-            cursor = conn.cursor()
-            
-            # Check if column exists
-            cursor.execute("PRAGMA table_info(visits)")
-            columns = [row[1] for row in cursor.fetchall()]
-            
-            if 'ai_summary' not in columns:
-                print("Adding ai_summary column to visits table...")
-                cursor.execute("ALTER TABLE visits ADD COLUMN ai_summary TEXT")
-                conn.commit()
-                print("✅ Migration completed successfully!")
-            else:
-                print("✅ ai_summary column already exists. No migration needed.")
-                
+        if args.status:
+            status = migration_status()
+            for version, name, state in status:
+                print(f"  {version:04d}  {name:<32} {state}")
+            return 1 if any(state == 'modified' for _, _, state in status) else 0
+
+        applied = migrate()
+        if applied:
+            print(f"✅ Applied migrations {', '.join(map(str, applied))}; schema is at version {LATEST_VERSION}")
+        else:
+            print(f"✅ Schema is up to date (version {LATEST_VERSION})")
+        return 0
+    except MigrationError as e:
+        print(f"❌ Migration refused: {e}", file=sys.stderr)
+        return 1
     except Exception as e:
-        print(f"❌ Migration failed: {e}")
+        print(f"❌ Migration failed: {e}", file=sys.stderr)
         raise
 
+
 if __name__ == "__main__":
-    migrate_database()
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Queue analytics report from the hourly rollup tables.
+
+Reads only the rollups, so it is cheap to run against a live clinic
+database however many visits it holds.
+
+Usage:
+    python scripts/queue_report.py [--days 7] [--granularity day|hour] [--tier SENIOR] [--district]
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from db.district_repo import get_district_queue_stats
+from db.stats_repo import get_queue_stats, get_wait_percentiles
+
+
+def fmt(value):
+    return '-' if value is None else f'{value:g}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--granularity', choices=('hour', 'day'), default='day')
+    parser.add_argument('--tier', choices=('JUNIOR', 'SENIOR'))
+    parser.add_argument('--district', action='store_true', help='all clinic shards')
+    args = parser.parse_args()
+
+    start = (datetime.now(timezone.utc) - timedelta(days=args.days)).strftime('%Y-%m-%d %H:00:00')
+    if args.district:
+        rows = get_district_queue_stats(start=start, tier=args.tier, granularity=args.granularity)
+    else:
+        rows = [dict(row, clinic_id='-') for row in get_queue_stats(start=start, tier=args.tier,
+                                                                   granularity=args.granularity)]
+
+    print(f"📊 Queue report since {start} UTC")
+    print()
+    print(f"{'clinic':<10} {'period':<20} {'tier':<7} {'arrived':>7} {'done':>6} "
+          f"{'wait avg':>8} {'p50':>6} {'p90':>6}   {'low/med/high':>14}")
+    for row in rows:
+        mix = f"{row['risk_low']}/{row['risk_medium']}/{row['risk_high']}"
+        print(f"{row['clinic_id']:<10} {row['period']:<20} {row['assigned_tier']:<7} {row['arrivals']:>7} "
+              f"{row['completions']:>6} {fmt(row['wait_mean']):>8} {fmt(row['wait_p50']):>6} "
+              f"{fmt(row['wait_p90']):>6}   {mix:>14}")
+    if not rows:
+        print("  (no visits in range)")
+
+    if not args.district:
+        percentiles = get_wait_percentiles(start=start, tier=args.tier)
+        print()
+        print(f"Wait over the whole range: p50 {fmt(percentiles[0.5])} min, p90 {fmt(percentiles[0.9])} min")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())